@@ -0,0 +1,69 @@
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class KeyedExecutor:
+    """Runs tasks on a thread pool, strictly one after another for the same key and in parallel for different keys.
+
+    At most max_pending tasks are queued or running; submit blocks until there's room, so a slow
+    consumer pushes back on whoever produces the tasks.
+    """
+
+    def __init__(self, workers: int = 8, max_pending: int = 1000):
+        if workers < 1 or max_pending < 1:
+            raise ValueError('workers and max_pending must be positive')
+        self.__max_pending = max_pending
+        self.__pending = 0
+        # tasks of every key that has some, the head of a deque is the one running or about to run
+        self.__tasks: Dict[Hashable, Deque[Callable[[], None]]] = {}
+        # keys whose head task isn't picked up by a worker yet
+        self.__ready: Deque[Hashable] = deque()
+        self.__lock = threading.Lock()
+        self.__has_room = threading.Condition(self.__lock)
+        self.__has_ready = threading.Condition(self.__lock)
+        for index in range(workers):
+            threading.Thread(target=self._run, name=f'keyed-executor-{index}', daemon=True).start()
+
+    @property
+    def pending(self) -> int:
+        return self.__pending
+
+    def submit(self, key: Hashable, task: Callable[[], None], timeout: Optional[float] = None) -> bool:
+        """Queues the task behind the other tasks of its key; returns False if there was no room within timeout"""
+        with self.__lock:
+            if not self.__has_room.wait_for(lambda: self.__pending < self.__max_pending, timeout):
+                return False
+            self.__pending += 1
+            tasks = self.__tasks.get(key)
+            if tasks:
+                tasks.append(task)
+            else:
+                self.__tasks[key] = deque([task])
+                self.__ready.append(key)
+                self.__has_ready.notify()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self.__lock:
+                self.__has_ready.wait_for(lambda: self.__ready)
+                key = self.__ready.popleft()
+                task = self.__tasks[key][0]
+            try:
+                task()
+            except Exception as e:
+                logger.exception(f'task for {key} failed: {e}')
+            with self.__lock:
+                tasks = self.__tasks[key]
+                tasks.popleft()
+                if tasks:
+                    self.__ready.append(key)
+                    self.__has_ready.notify()
+                else:
+                    del self.__tasks[key]
+                self.__pending -= 1
+                self.__has_room.notify()
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# work done outside of any bot handler (pollers, batch flushes) is reported under this name
+BACKGROUND = 'background'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f'{self.name} takes labels {self.label_names}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        super().__init__(name, documentation, label_names)
+        self.__values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.__values[key] = self.__values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self.__values.items())
+        return self._header() + [f'{self.name}{_format_labels(list(zip(self.label_names, key)))} {value}'
+                                 for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, slow_threshold: Optional[float] = None):
+        super().__init__(name, documentation, label_names)
+        self.__buckets = tuple(sorted(buckets))
+        # observations at or above this are logged, None turns it off
+        self.slow_threshold = slow_threshold
+        # per label set: count in every bucket (not cumulative), sum, count
+        self.__values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, seconds: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self.__values.get(key) or ([0] * len(self.__buckets), 0.0, 0)
+            for index, bound in enumerate(self.__buckets):
+                if seconds <= bound:
+                    counts[index] += 1
+                    break
+            self.__values[key] = counts, total + seconds, count + 1
+        if self.slow_threshold is not None and seconds >= self.slow_threshold:
+            logger.warning(f'slow {self.name} {labels}: {seconds:.3f}s')
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self.__values.items())
+        lines = self._header()
+        for key, (counts, total, count) in values:
+            pairs = list(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.__buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(pairs + [("le", repr(bound))])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(pairs + [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(pairs)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(pairs)} {count}')
+        return lines
+
+
+class Metrics:
+    """Registry of counters and histograms, rendered in the Prometheus text format.
+
+    Also tracks which bot handler the current thread works for, so lower layers can attribute their
+    calls to it without having it passed down.
+    """
+
+    def __init__(self, slow_threshold: float = 1.0):
+        self.__slow_threshold = slow_threshold
+        self.__metrics: Dict[str, _Metric] = {}
+        self.__slow_logged: List[Histogram] = []
+        self.__lock = threading.Lock()
+        self.__current = threading.local()
+
+    @property
+    def slow_threshold(self) -> float:
+        return self.__slow_threshold
+
+    @slow_threshold.setter
+    def slow_threshold(self, seconds: float) -> None:
+        with self.__lock:
+            self.__slow_threshold = seconds
+            for histogram in self.__slow_logged:
+                histogram.slow_threshold = seconds
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self.__lock:
+            if metric.name in self.__metrics:
+                raise ValueError(f'metric {metric.name} is already registered')
+            self.__metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS, log_slow: bool = True) -> Histogram:
+        histogram = self._register(Histogram(name, documentation, label_names, buckets,
+                                             self.__slow_threshold if log_slow else None))
+        if log_slow:
+            with self.__lock:
+                self.__slow_logged.append(histogram)
+        return histogram
+
+    def current_handler(self) -> str:
+        return getattr(self.__current, 'handler', None) or BACKGROUND
+
+    @contextmanager
+    def handler(self, name: str) -> Iterator[None]:
+        """Attributes everything the current thread does inside the block to the handler"""
+        previous = getattr(self.__current, 'handler', None)
+        self.__current.handler = name
+        try:
+            yield
+        finally:
+            self.__current.handler = previous
+
+    def bind_handler(self, name: str, func: Callable) -> Callable:
+        """Wraps func to run on behalf of the handler, for callbacks that run on some other thread"""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.handler(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def render(self) -> str:
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> HTTPServer:
+        """Serves the metrics on http://host:port/metrics from a background thread"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        class MetricsServer(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        server = MetricsServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        logger.info(f'serving metrics on http://{host}:{port}/metrics')
+        return server
+
+
+METRICS = Metrics()
@@ -0,0 +1,65 @@
+import heapq
+import logging
+import threading
+from typing import Callable, Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+
+class NonceManager:
+    """Hands out transaction nonces locally so several transactions of one account can be in flight at once.
+
+    Nonces of transactions that never made it into the pool (failed send, dropped) are handed out again
+    before new ones, otherwise every later transaction of the account would be stuck behind the gap.
+    """
+
+    def __init__(self, get_transaction_count: Callable[[str], int]):
+        self.__get_transaction_count = get_transaction_count
+        self.__lock = threading.Lock()
+        self.__next: Dict[str, int] = {}
+        self.__gaps: Dict[str, List[int]] = {}
+        self.__in_flight: Dict[str, Set[int]] = {}
+
+    def _ensure_synced(self, account: str) -> None:
+        if account not in self.__next:
+            self.__next[account] = self.__get_transaction_count(account)
+            self.__gaps[account] = []
+            self.__in_flight[account] = set()
+
+    def allocate(self, account: str) -> int:
+        with self.__lock:
+            self._ensure_synced(account)
+            if self.__gaps[account]:
+                nonce = heapq.heappop(self.__gaps[account])
+            else:
+                nonce = self.__next[account]
+                self.__next[account] += 1
+            self.__in_flight[account].add(nonce)
+            return nonce
+
+    def confirm(self, account: str, nonce: int) -> None:
+        """The transaction with this nonce is mined"""
+        with self.__lock:
+            self.__in_flight.get(account, set()).discard(nonce)
+
+    def release(self, account: str, nonce: int) -> None:
+        """The transaction with this nonce is not going to be mined, so the nonce has to be reused"""
+        with self.__lock:
+            self.__in_flight[account].discard(nonce)
+            if nonce == self.__next[account] - 1:
+                self.__next[account] = nonce
+            elif nonce not in self.__gaps[account]:
+                heapq.heappush(self.__gaps[account], nonce)
+
+    def resync(self, account: str) -> None:
+        """Reconciles local state with the node's pending transaction count"""
+        pending_count = self.__get_transaction_count(account)
+        with self.__lock:
+            self._ensure_synced(account)
+            in_flight = self.__in_flight[account]
+            upper = max(max(in_flight, default=-1) + 1, pending_count)
+            # everything below the node's count is used up, everything above it that's not in flight is a gap
+            self.__gaps[account] = [nonce for nonce in range(pending_count, upper) if nonce not in in_flight]
+            if self.__next[account] != upper:
+                logger.warning(f'nonce of {account} resynced from {self.__next[account]} to {upper}')
+            self.__next[account] = upper
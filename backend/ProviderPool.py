@@ -0,0 +1,243 @@
+import itertools
+import json
+import logging
+import threading
+import time
+from typing import List, Optional, Sequence, Union
+
+from web3 import Web3, HTTPProvider, IPCProvider, WebsocketProvider
+from web3.providers import BaseProvider
+from web3.utils.request import make_post_request
+
+from backend.Metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+RPC_SECONDS = METRICS.histogram('voting_rpc_seconds', 'Round trip of JSON-RPC requests, a batch is one round trip',
+                                ('method', 'endpoint', 'handler'))
+RPC_REQUESTS = METRICS.counter('voting_rpc_requests_total', 'JSON-RPC requests, every request of a batch counts',
+                               ('method', 'endpoint', 'handler'))
+RPC_ERRORS = METRICS.counter('voting_rpc_errors_total', 'JSON-RPC round trips that failed with an exception',
+                             ('method', 'endpoint', 'handler'))
+
+# requests touching the admin accounts' state must see every transaction we sent, so they never leave the primary
+PRIMARY_METHODS = {
+    'eth_accounts', 'eth_sendTransaction', 'eth_sendRawTransaction', 'eth_sign', 'eth_getTransactionCount',
+    'eth_estimateGas', 'eth_getTransactionByHash', 'eth_getTransactionReceipt', 'eth_newFilter',
+    'eth_newBlockFilter', 'eth_getFilterChanges', 'eth_getFilterLogs', 'eth_uninstallFilter',
+}
+# position of the block parameter of reads that can be pinned to a block
+BLOCK_PARAMETERS = {'eth_call': 1, 'eth_getCode': 1, 'eth_getBalance': 1, 'eth_getStorageAt': 2,
+                    'eth_getBlockByNumber': 0}
+
+
+def _block_number(value) -> Optional[int]:
+    """Block number of a hex or int block parameter or eth_blockNumber result, None for tags like 'latest'"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.startswith('0x'):
+        return int(value, 16)
+
+
+class _Endpoint:
+    def __init__(self, endpoint: Union[str, BaseProvider]):
+        if isinstance(endpoint, BaseProvider):
+            self.provider = endpoint
+            self.uri = endpoint.endpoint_uri if isinstance(endpoint, HTTPProvider) else type(endpoint).__name__
+        elif endpoint.startswith(('http://', 'https://')):
+            self.provider = HTTPProvider(endpoint)
+            self.uri = endpoint
+        elif endpoint.startswith(('ws://', 'wss://')):
+            self.provider = WebsocketProvider(endpoint)
+            self.uri = endpoint
+        else:
+            self.provider = IPCProvider(endpoint)
+            self.uri = endpoint
+        # going through the provider's own middlewares keeps its retry and conversion logic
+        self.request = self.provider.request_func(Web3(self.provider), [])
+        self.healthy = True
+        self.latency = 0.0
+        self.block_number = -1
+
+    @property
+    def supports_batches(self) -> bool:
+        return isinstance(self.provider, HTTPProvider)
+
+    def record_latency(self, seconds: float) -> None:
+        self.latency = seconds if not self.latency else 0.8 * self.latency + 0.2 * seconds
+
+    def __str__(self) -> str:
+        return self.uri
+
+
+class ProviderPool(BaseProvider):
+    """Spreads read-only requests over several nodes and pins everything else to the first (primary) one.
+
+    A background health check drops nodes that fail or lag behind by more than max_lag blocks and
+    brings them back once they answer again. Reads only go to nodes known to have the block they are
+    pinned to and the block of our latest mined transaction.
+    """
+
+    def __init__(self, endpoints: Sequence[Union[str, BaseProvider]], strategy: str = 'round_robin',
+                 health_check_interval: float = 5.0, max_lag: int = 2):
+        if not endpoints:
+            raise ValueError('at least one endpoint is required')
+        if strategy not in ('round_robin', 'least_latency'):
+            raise ValueError(f'unknown strategy {strategy}')
+        self.__endpoints = [_Endpoint(endpoint) for endpoint in endpoints]
+        self.__primary = self.__endpoints[0]
+        self.__strategy = strategy
+        self.__max_lag = max_lag
+        # highest block holding one of our transactions, reads have to see it
+        self.__written_block = -1
+        self.__counter = itertools.count()
+        self.__lock = threading.Lock()
+        self.__health_check_interval = health_check_interval
+        if len(self.__endpoints) > 1:
+            threading.Thread(target=self._run_health_checks, name='rpc-health-check', daemon=True).start()
+
+    @property
+    def endpoints(self) -> List[str]:
+        return [str(endpoint) for endpoint in self.__endpoints]
+
+    def _read_endpoints(self, min_block: int = -1) -> List[_Endpoint]:
+        """Healthy endpoints known to have min_block, falling back to the primary"""
+        if len(self.__endpoints) == 1:
+            return [self.__primary]
+        with self.__lock:
+            healthy = [endpoint for endpoint in self.__endpoints
+                       if endpoint.healthy and endpoint.block_number >= min_block]
+        if not healthy:
+            return [self.__primary]
+        if self.__strategy == 'least_latency':
+            return sorted(healthy, key=lambda endpoint: endpoint.latency)
+        start = next(self.__counter) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def _mark_unhealthy(self, endpoint: _Endpoint, error: Exception) -> None:
+        with self.__lock:
+            if endpoint.healthy:
+                logger.warning(f'ejecting {endpoint}: {error}')
+            endpoint.healthy = False
+
+    def _timed(self, endpoint: _Endpoint, method: str, count: int, request, *args):
+        labels = {'method': method, 'endpoint': endpoint.uri, 'handler': METRICS.current_handler()}
+        RPC_REQUESTS.inc(count, **labels)
+        started = time.monotonic()
+        try:
+            result = request(*args)
+        except Exception:
+            RPC_ERRORS.inc(**labels)
+            raise
+        elapsed = time.monotonic() - started
+        endpoint.record_latency(elapsed)
+        RPC_SECONDS.observe(elapsed, **labels)
+        return result
+
+    def _required_block(self, method: str, params: list) -> int:
+        """Block a node must have to answer the read: the one it is pinned to, otherwise the block of our latest
+        transaction so that reads after our own writes see them"""
+        if method == 'eth_getLogs':
+            block = params[0].get('toBlock') if params else None
+        else:
+            position = BLOCK_PARAMETERS.get(method)
+            block = params[position] if position is not None and len(params) > position else None
+        block = _block_number(block)
+        return self.__written_block if block is None else block
+
+    def _observe(self, endpoint: _Endpoint, method: str, responses: list) -> None:
+        """Learns from block numbers and receipts up to which block the endpoint can be asked for"""
+        if method == 'eth_blockNumber':
+            blocks = [_block_number(response.get('result')) for response in responses]
+        elif method == 'eth_getTransactionReceipt':
+            blocks = [_block_number((response.get('result') or {}).get('blockNumber')) for response in responses]
+        else:
+            return
+        blocks = [block for block in blocks if block is not None]
+        if not blocks:
+            return
+        with self.__lock:
+            endpoint.block_number = max(endpoint.block_number, *blocks)
+            if method == 'eth_getTransactionReceipt':
+                self.__written_block = max(self.__written_block, *blocks)
+
+    def make_request(self, method, params):
+        if method in PRIMARY_METHODS:
+            response = self._timed(self.__primary, method, 1, self.__primary.request, method, params)
+            self._observe(self.__primary, method, [response])
+            return response
+        last_error = None
+        # a lagging node would answer with an unknown block error or data from before our transactions
+        for endpoint in self._read_endpoints(self._required_block(method, params)):
+            try:
+                response = self._timed(endpoint, method, 1, endpoint.request, method, params)
+                self._observe(endpoint, method, [response])
+                return response
+            except (IOError, TimeoutError) as e:
+                self._mark_unhealthy(endpoint, e)
+                last_error = e
+        raise last_error
+
+    def make_batch_request(self, method: str, params_list: List[list]) -> list:
+        """Sends the requests as one JSON-RPC batch to a single node; returns the raw responses in request order"""
+        if method in PRIMARY_METHODS:
+            endpoints = [self.__primary]
+        else:
+            endpoints = self._read_endpoints(max(self._required_block(method, params) for params in params_list))
+        last_error = None
+        for endpoint in endpoints:
+            try:
+                responses = self._timed(endpoint, method, len(params_list), self._send_batch, endpoint, method,
+                                        params_list)
+                self._observe(endpoint, method, responses)
+                return responses
+            except (IOError, TimeoutError) as e:
+                self._mark_unhealthy(endpoint, e)
+                last_error = e
+        raise last_error
+
+    @staticmethod
+    def _send_batch(endpoint: _Endpoint, method: str, params_list: List[list]) -> list:
+        if not endpoint.supports_batches:
+            # websocket and IPC providers only speak single requests, they still save the connection setup
+            return [dict(endpoint.request(method, params), id=request_id)
+                    for request_id, params in enumerate(params_list)]
+        payload = [{'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+                   for request_id, params in enumerate(params_list)]
+        # the provider's request kwargs carry its headers, timeout and auth
+        provider = endpoint.provider
+        response = json.loads(make_post_request(provider.endpoint_uri, json.dumps(payload),
+                                                **provider.get_request_kwargs()))
+        if not isinstance(response, list):
+            raise ValueError(f'batch request rejected by {endpoint}: {response}')
+        return sorted(response, key=lambda r: r['id'])
+
+    def _check_health(self) -> None:
+        for endpoint in self.__endpoints:
+            try:
+                response = self._timed(endpoint, 'eth_blockNumber', 1, endpoint.request, 'eth_blockNumber', [])
+                endpoint.block_number = int(response['result'], 16) if isinstance(response['result'], str) \
+                    else response['result']
+            except Exception as e:
+                self._mark_unhealthy(endpoint, e)
+                endpoint.block_number = -1
+        head = max(endpoint.block_number for endpoint in self.__endpoints)
+        with self.__lock:
+            for endpoint in self.__endpoints:
+                healthy = endpoint.block_number >= 0 and head - endpoint.block_number <= self.__max_lag
+                if healthy and not endpoint.healthy:
+                    logger.info(f'reinstating {endpoint}')
+                elif not healthy and endpoint.healthy:
+                    logger.warning(f'ejecting {endpoint}: at block {endpoint.block_number}, head is {head}')
+                endpoint.healthy = healthy
+
+    def _run_health_checks(self) -> None:
+        while True:
+            time.sleep(self.__health_check_interval)
+            try:
+                self._check_health()
+            except Exception as e:
+                logger.error(f'health check failed: {e}')
+
+    def isConnected(self):
+        return any(endpoint.provider.isConnected() for endpoint in self.__endpoints)
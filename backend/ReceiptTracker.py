@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from backend.Metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait for a transaction to be mined, both in the tracker and for callers blocking on it
+RECEIPT_TIMEOUT = 120
+
+
+class PendingTransaction(Future):
+    """Future resolved with the receipt once the transaction is mined"""
+
+    def __init__(self, transaction_hash: bytes):
+        super().__init__()
+        self.transaction_hash = transaction_hash
+        # callbacks run on the tracker's threads, but on behalf of the handler that sent the transaction
+        self.handler = METRICS.current_handler()
+
+    def succeeded(self) -> bool:
+        if not self.done() or self.exception() is not None:
+            return False
+        # pre-byzantium receipts have no status field, those transactions can't be told apart from successful ones
+        return self.result().get('status', 1) == 1
+
+
+class ReceiptTracker:
+    """Polls receipts of all pending transactions in bulk from a single background thread.
+
+    Completion callbacks run on a small worker pool so a slow callback never delays receipt polling.
+    """
+
+    def __init__(self, get_receipts: Callable[[List[bytes]], List[Optional[dict]]], poll_interval: float = 0.5,
+                 timeout: float = RECEIPT_TIMEOUT, callback_workers: int = 4):
+        self.__get_receipts = get_receipts
+        self.__poll_interval = poll_interval
+        self.__timeout = timeout
+        self.__pending: Dict[bytes, PendingTransaction] = {}
+        self.__deadlines: Dict[bytes, float] = {}
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Event()
+        self.__executor = ThreadPoolExecutor(max_workers=callback_workers, thread_name_prefix='receipt-callback')
+        self.__thread = threading.Thread(target=self._run, name='receipt-tracker', daemon=True)
+        self.__thread.start()
+
+    def track(self, transaction_hash: bytes) -> PendingTransaction:
+        pending = PendingTransaction(transaction_hash)
+        with self.__lock:
+            self.__pending[transaction_hash] = pending
+            self.__deadlines[transaction_hash] = time.monotonic() + self.__timeout
+        self.__wakeup.set()
+        return pending
+
+    def _resolve(self, transaction_hash: bytes, receipt: Optional[dict] = None,
+                 exception: Optional[Exception] = None) -> None:
+        with self.__lock:
+            pending = self.__pending.pop(transaction_hash)
+            del self.__deadlines[transaction_hash]
+        if exception is not None:
+            self.__executor.submit(METRICS.bind_handler(pending.handler, pending.set_exception), exception)
+        else:
+            self.__executor.submit(METRICS.bind_handler(pending.handler, pending.set_result), receipt)
+
+    def _poll(self) -> None:
+        with self.__lock:
+            hashes = list(self.__pending)
+        if not hashes:
+            return
+        try:
+            receipts = self.__get_receipts(hashes)
+        except Exception as e:
+            # deadlines still apply while the node is unreachable
+            logger.error(f'receipt polling failed: {e}')
+            receipts = [None] * len(hashes)
+        now = time.monotonic()
+        for transaction_hash, receipt in zip(hashes, receipts):
+            if receipt is not None:
+                self._resolve(transaction_hash, receipt)
+            elif now > self.__deadlines[transaction_hash]:
+                self._resolve(transaction_hash, exception=TimeoutError(
+                    f'transaction {transaction_hash.hex()} is not mined after {self.__timeout} seconds'))
+
+    def _run(self) -> None:
+        while True:
+            self.__wakeup.wait()
+            try:
+                self._poll()
+            except Exception as e:
+                logger.error(f'receipt polling failed: {e}')
+            with self.__lock:
+                if not self.__pending:
+                    self.__wakeup.clear()
+            time.sleep(self.__poll_interval)
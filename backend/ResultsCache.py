@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Results = Tuple[Tuple[str, int], ...]
+
+
+class _Entry(NamedTuple):
+    # block the tallies were read at
+    block: int
+    results: Results
+    # latest block of our own votes added on top of the read, the entry is current up to this block
+    valid_through: int
+
+
+class ResultsCache:
+    """LRU cache of voting results keyed by address and the block they were read at, so they stay valid until
+    the next block.
+
+    Concurrent misses for the same voting and block share a single chain read. Votes we send are added to the
+    cached tallies once mined, votes sent by others show up with the next block.
+    """
+
+    def __init__(self, get_block_number: Callable[[], int], block_poll_interval: float = 1.0,
+                 capacity: int = 1024):
+        self.__get_block_number = get_block_number
+        self.__block_poll_interval = block_poll_interval
+        self.__capacity = capacity
+        self.__block = -1
+        self.__block_checked = 0.0
+        self.__block_lock = threading.Lock()
+        self.__entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self.__in_flight: Dict[Tuple[str, int], Future] = {}
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def latest_block(self) -> Optional[int]:
+        """Latest block number, asked from the node at most once per block_poll_interval; while the node can't be
+        asked it's the last known one, None if there is none"""
+        with self.__block_lock:
+            if time.monotonic() - self.__block_checked >= self.__block_poll_interval:
+                try:
+                    self.__block = max(self.__block, self.__get_block_number())
+                except Exception as e:
+                    logger.warning(f'block number check failed, staying at block {self.__block}: {e}')
+                self.__block_checked = time.monotonic()
+            return self.__block if self.__block >= 0 else None
+
+    def get(self, address: str, read: Callable[[Union[int, str]], Optional[Results]]) -> Optional[Results]:
+        """Returns cached results or reads them with read(block); None results are handed out but never cached"""
+        block = self.latest_block()
+        if block is None:
+            # no block to key the entry on, the read reports the node error as usual
+            return read('latest')
+        with self.__lock:
+            entry = self.__entries.get(address)
+            if entry is not None and entry.valid_through >= block:
+                self.__entries.move_to_end(address)
+                self.hits += 1
+                return entry.results
+            flight = self.__in_flight.get((address, block))
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self.__in_flight[address, block] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result()
+        try:
+            results = read(block)
+        except Exception as e:
+            with self.__lock:
+                del self.__in_flight[address, block]
+            flight.set_exception(e)
+            raise
+        with self.__lock:
+            del self.__in_flight[address, block]
+            current = self.__entries.get(address)
+            if results is not None and (current is None or current.block < block):
+                self.__entries[address] = _Entry(block, results, block)
+                self.__entries.move_to_end(address)
+                while len(self.__entries) > self.__capacity:
+                    self.__entries.popitem(last=False)
+        flight.set_result(results)
+        return results
+
+    def record_vote(self, address: str, candidate_index: int, block: int) -> None:
+        """Adds our vote mined in block to the cached tallies, unless the cached read already includes it"""
+        with self.__block_lock:
+            # the voter is going to look at the results next, they have to be read at the vote's block or later
+            self.__block = max(self.__block, block)
+        with self.__lock:
+            entry = self.__entries.get(address)
+            if entry is None or entry.block >= block:
+                return
+            if entry.valid_through < block - 1 or not 0 <= candidate_index < len(entry.results):
+                # blocks in between weren't seen, the tallies have to be read again
+                del self.__entries[address]
+                return
+            results = list(entry.results)
+            name, votes = results[candidate_index]
+            results[candidate_index] = (name, votes + 1)
+            self.__entries[address] = _Entry(entry.block, tuple(results), max(entry.valid_through, block))
+            self.__entries.move_to_end(address)
+
+    def invalidate(self, address: str) -> None:
+        with self.__lock:
+            self.__entries.pop(address, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {'size': len(self.__entries), 'capacity': self.__capacity, 'hits': self.hits,
+                    'misses': self.misses, 'coalesced': self.coalesced}
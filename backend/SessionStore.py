@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from backend.SqliteConnections import SqliteConnections
+
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+class SessionStore(ABC):
+    """Per-user conversation data, grouped in namespaces; values must be JSON-serializable"""
+
+    @abstractmethod
+    def get(self, namespace: str, key: Any) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def set(self, namespace: str, key: Any, value: Any) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, namespace: str, key: Any) -> None:
+        pass
+
+    @abstractmethod
+    def keys(self, namespace: str) -> Iterator[Any]:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Keeps sessions in the current process only"""
+
+    def __init__(self):
+        self.__data: Dict[str, Dict[str, str]] = {}
+        self.__lock = threading.Lock()
+
+    def get(self, namespace: str, key: Any) -> Optional[Any]:
+        with self.__lock:
+            value = self.__data.get(namespace, {}).get(_dump(key))
+        return None if value is None else json.loads(value)
+
+    def set(self, namespace: str, key: Any, value: Any) -> None:
+        with self.__lock:
+            self.__data.setdefault(namespace, {})[_dump(key)] = _dump(value)
+
+    def delete(self, namespace: str, key: Any) -> None:
+        with self.__lock:
+            self.__data.get(namespace, {}).pop(_dump(key), None)
+
+    def keys(self, namespace: str) -> Iterator[Any]:
+        with self.__lock:
+            keys = list(self.__data.get(namespace, {}))
+        return (json.loads(key) for key in keys)
+
+
+class SqliteSessionStore(SessionStore):
+    """Keeps sessions in a SQLite file, so every bot process on the machine sees the same state"""
+
+    def __init__(self, path: str):
+        # a power cut may lose the last writes, but sessions are cheap to redo and a full sync per write is not
+        self.__connections = SqliteConnections(path, synchronous='NORMAL')
+        self._connection().execute('CREATE TABLE IF NOT EXISTS sessions (namespace TEXT NOT NULL, key TEXT NOT NULL, '
+                                   'value TEXT NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID')
+
+    def _connection(self) -> sqlite3.Connection:
+        return self.__connections.get()
+
+    def get(self, namespace: str, key: Any) -> Optional[Any]:
+        row = self._connection().execute('SELECT value FROM sessions WHERE namespace = ? AND key = ?',
+                                         (namespace, _dump(key))).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, namespace: str, key: Any, value: Any) -> None:
+        self._connection().execute('INSERT OR REPLACE INTO sessions (namespace, key, value) VALUES (?, ?, ?)',
+                                   (namespace, _dump(key), _dump(value)))
+
+    def delete(self, namespace: str, key: Any) -> None:
+        self._connection().execute('DELETE FROM sessions WHERE namespace = ? AND key = ?', (namespace, _dump(key)))
+
+    def keys(self, namespace: str) -> Iterator[Any]:
+        rows = self._connection().execute('SELECT key FROM sessions WHERE namespace = ?', (namespace,)).fetchall()
+        return (json.loads(row[0]) for row in rows)
+
+
+class SessionConversations(MutableMapping):
+    """Dict-like view of conversation states kept in a SessionStore, keyed the way ConversationHandler keys them"""
+
+    def __init__(self, store: SessionStore, namespace: str = 'conversation'):
+        self.__store = store
+        self.__namespace = namespace
+
+    def __getitem__(self, key: Tuple[int, ...]) -> int:
+        state = self.__store.get(self.__namespace, list(key))
+        if state is None:
+            raise KeyError(key)
+        return state
+
+    def __setitem__(self, key: Tuple[int, ...], state: int) -> None:
+        self.__store.set(self.__namespace, list(key), state)
+
+    def __delitem__(self, key: Tuple[int, ...]) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.__store.delete(self.__namespace, list(key))
+
+    def __contains__(self, key) -> bool:
+        return self.__store.get(self.__namespace, list(key)) is not None
+
+    def __iter__(self) -> Iterator[Tuple[int, ...]]:
+        return (tuple(key) for key in self.__store.keys(self.__namespace))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.__store.keys(self.__namespace))
@@ -0,0 +1,24 @@
+import sqlite3
+import threading
+from typing import Optional
+
+
+class SqliteConnections:
+    """Hands every thread its own autocommit connection to one SQLite file in WAL mode, so readers in other
+    threads and processes never wait for a writer"""
+
+    def __init__(self, path: str, synchronous: Optional[str] = None):
+        self.__path = path
+        self.__synchronous = synchronous
+        self.__local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        # sqlite connections can't be shared between threads
+        connection = getattr(self.__local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.__path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            if self.__synchronous:
+                connection.execute(f'PRAGMA synchronous={self.__synchronous}')
+            self.__local.connection = connection
+        return connection
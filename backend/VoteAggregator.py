@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, NamedTuple
+
+from backend.ReceiptTracker import PendingTransaction
+from backend.VotingContract import VotingContract
+
+logger = logging.getLogger(__name__)
+
+
+class _QueuedVote(NamedTuple):
+    voter_id: int
+    candidate_index: int
+    accepted: Future
+
+
+class _VoteQueue:
+    def __init__(self, contract: VotingContract, deadline: float):
+        self.contract = contract
+        self.deadline = deadline
+        self.votes: List[_QueuedVote] = []
+        self.voters = set()
+
+
+class VoteAggregator:
+    """Coalesces votes for the same voting into one voteBatch transaction.
+
+    A batch is sent once it holds max_batch_size votes or max_delay seconds after its first vote,
+    whichever comes first. Every submitted vote gets a future resolved with the number of the block
+    it was counted in, or None if it wasn't counted.
+    """
+
+    def __init__(self, max_batch_size: int = 50, max_delay: float = 1.0):
+        self.__max_batch_size = max_batch_size
+        self.__max_delay = max_delay
+        self.__queues: Dict[str, _VoteQueue] = {}
+        self.__condition = threading.Condition()
+        self.__thread = threading.Thread(target=self._run, name='vote-aggregator', daemon=True)
+        self.__thread.start()
+
+    def submit(self, contract: VotingContract, voter_id: int, candidate_index: int) -> Future:
+        if not contract.supports_vote_batch:
+            return self.submit_single(contract, voter_id, candidate_index)
+        accepted = Future()
+        full_queue = None
+        with self.__condition:
+            queue = self.__queues.get(contract.address)
+            if queue is None:
+                queue = self.__queues[contract.address] = _VoteQueue(contract, time.monotonic() + self.__max_delay)
+                self.__condition.notify()
+            if voter_id in queue.voters:
+                # the contract would skip it anyway
+                accepted.set_result(None)
+                return accepted
+            queue.voters.add(voter_id)
+            queue.votes.append(_QueuedVote(voter_id, candidate_index, accepted))
+            if len(queue.votes) >= self.__max_batch_size:
+                full_queue = self.__queues.pop(contract.address)
+        if full_queue:
+            self._flush(full_queue)
+        return accepted
+
+    @staticmethod
+    def submit_single(contract: VotingContract, voter_id: int, candidate_index: int) -> Future:
+        """Sends the vote as its own transaction, resolving the future the same way submit does"""
+        accepted = Future()
+        pending = contract.submit_vote(voter_id, candidate_index)
+        if not pending:
+            accepted.set_result(None)
+        else:
+            pending.add_done_callback(
+                lambda mined: accepted.set_result(mined.result().blockNumber if mined.succeeded() else None))
+        return accepted
+
+    def _flush(self, queue: _VoteQueue) -> None:
+        pending = queue.contract.submit_vote_batch([vote.voter_id for vote in queue.votes],
+                                                   [vote.candidate_index for vote in queue.votes])
+        if not pending:
+            for vote in queue.votes:
+                vote.accepted.set_result(None)
+            return
+        logger.info(f'sent {len(queue.votes)} votes to {queue.contract.address} in one transaction')
+
+        def batch_mined(mined: PendingTransaction):
+            outcome = queue.contract.get_vote_batch_outcome(mined.result()) if mined.succeeded() else {}
+            for vote in queue.votes:
+                vote.accepted.set_result(mined.result().blockNumber if outcome.get(vote.voter_id) else None)
+
+        pending.add_done_callback(batch_mined)
+
+    def _run(self) -> None:
+        while True:
+            with self.__condition:
+                while not self.__queues:
+                    self.__condition.wait()
+                now = time.monotonic()
+                due = [address for address, queue in self.__queues.items() if queue.deadline <= now]
+                due_queues = [self.__queues.pop(address) for address in due]
+                if not due_queues:
+                    self.__condition.wait(min(queue.deadline for queue in self.__queues.values()) - now)
+            for queue in due_queues:
+                try:
+                    self._flush(queue)
+                except Exception as e:
+                    logger.error(f'flushing votes for {queue.contract.address} failed: {e}')
+                    for vote in queue.votes:
+                        if not vote.accepted.done():
+                            vote.accepted.set_result(None)
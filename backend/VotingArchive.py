@@ -0,0 +1,43 @@
+import json
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+from backend.SqliteConnections import SqliteConnections
+
+
+class VotingArchive:
+    """Append-only SQLite archive of the final results of votings, keyed by address.
+
+    Finalized contracts self-destruct, so this is the only place their results survive. Entries are
+    never changed once written; several processes can share one archive file.
+    """
+
+    def __init__(self, path: str):
+        self.__connections = SqliteConnections(path)
+        self._connection().execute('CREATE TABLE IF NOT EXISTS finalized (address TEXT PRIMARY KEY, '
+                                   'results TEXT NOT NULL, finalized_at INTEGER NOT NULL) WITHOUT ROWID')
+
+    def _connection(self) -> sqlite3.Connection:
+        return self.__connections.get()
+
+    @staticmethod
+    def _key(address: str) -> str:
+        # users type addresses in any case
+        return address.lower()
+
+    def add(self, address: str, results: List[Tuple[str, int]]) -> None:
+        self._connection().execute('INSERT OR IGNORE INTO finalized (address, results, finalized_at) VALUES (?, ?, ?)',
+                                   (self._key(address), json.dumps(results, separators=(',', ':'),
+                                                                   ensure_ascii=False), int(time.time())))
+
+    def get(self, address: str) -> Optional[List[Tuple[str, int]]]:
+        row = self._connection().execute('SELECT results FROM finalized WHERE address = ?',
+                                         (self._key(address),)).fetchone()
+        if row is None:
+            return
+        return [(candidate, votes) for candidate, votes in json.loads(row[0])]
+
+    def __contains__(self, address: str) -> bool:
+        return self._connection().execute('SELECT 1 FROM finalized WHERE address = ?',
+                                          (self._key(address),)).fetchone() is not None
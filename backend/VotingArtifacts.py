@@ -0,0 +1,10 @@
+"""ABIs and bytecode of voting.sol, generated by compile_contracts.py with solc 0.4.25+commit.59dbf8f1;
+do not edit by hand"""
+
+VOTING_ABI = '[{"constant":false,"inputs":[],"name":"kill","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"getResults","outputs":[{"name":"","type":"bytes32[]"},{"name":"","type":"uint256[]"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"getNumberOfCandidates","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"getOwner","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"packedCandidates","type":"bytes"},{"name":"ownerId","type":"uint256"},{"name":"votingAdmin","type":"address"}],"name":"initialize","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"voterId","type":"uint256"},{"name":"candidateIndex","type":"uint256"}],"name":"vote","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"voterIds","type":"uint256[]"},{"name":"candidateIndexes","type":"uint256[]"}],"name":"voteBatch","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"voterId","type":"uint256"}],"name":"hasVoted","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"inputs":[{"name":"candidates","type":"bytes"},{"name":"ownerId","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"},{"anonymous":false,"inputs":[{"indexed":true,"name":"voterId","type":"uint256"},{"indexed":false,"name":"candidateIndex","type":"uint256"}],"name":"Voted","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"voterId","type":"uint256"}],"name":"VoteSkipped","type":"event"},{"anonymous":false,"inputs":[],"name":"Finalized","type":"event"}]'
+
+VOTING_BYTECODE = '0x608060405234801561001057600080fd5b50604051610e69380380610e6983398101806040528101908080518201929190602001805190602001909291905050506000806000336000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff1602179055508360018190555060009150600090505b84518110156102375760007f01000000000000000000000000000000000000000000000000000000000000000285828151811015156100d057fe5b9060200101517f010000000000000000000000000000000000000000000000000000000000000090047f0100000000000000000000000000000000000000000000000000000000000000027effffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff19161415610185576002839080600181540180825580915050906001820390600052602060002001600090919290919091509060001916905550600060010292506000915061022a565b60208210151561019457600080fd5b6008820285828151811015156101a657fe5b9060200101517f010000000000000000000000000000000000000000000000000000000000000090047f0100000000000000000000000000000000000000000000000000000000000000027effffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff1916600019169060020a90048317925081806001019250505b8080600101915050610095565b600283908060018154018082558091505090600182039060005260206000200160009091929091909150906000191690555060028054905060038161027c9190610287565b5050505050506102d8565b8154818355818111156102ae578183600052602060002091820191016102ad91906102b3565b5b505050565b6102d591905b808211156102d15760008160009055506001016102b9565b5090565b90565b610b82806102e76000396000f30060806040526004361061008e576000357c0100000000000000000000000000000000000000000000000000000000900463ffffffff16806341c0e1b5146100935780634717f97c146100aa5780637a84d13e1461015e578063893d20e81461018957806395324411146101b4578063b384abef14610247578063ca09dd791461027e578063ecca031f14610327575b600080fd5b34801561009f57600080fd5b506100a861036c565b005b3480156100b657600080fd5b506100bf61042d565b604051808060200180602001838103835285818151815260200191508051906020019060200280838360005b838110156101065780820151818401526020810190506100eb565b50505050905001838103825284818151815260200191508051906020019060200280838360005b8381101561014857808201518184015260208101905061012d565b5050505090500194505050505060405180910390f35b34801561016a57600080fd5b5061017361053f565b6040518082815260200191505060405180910390f35b34801561019557600080fd5b5061019e61054c565b6040518082815260200191505060405180910390f35b3480156101c057600080fd5b50610245600480360381019080803590602001908201803590602001908080601f016020809104026020016040519081016040528093929190818152602001838380828437820191505050505050919291929080359060200190929190803573ffffffffffffffffffffffffffffffffffffffff169060200190929190505050610556565b005b34801561025357600080fd5b5061027c600480360381019080803590602001909291908035906020019092919050505061076f565b005b34801561028a57600080fd5b50610325600480360381019080803590602001908201803590602001908080602002602001604051908101604052809392919081815260200183836020028082843782019150505050505091929192908035906020019082018035906020019080806020026020016040519081016040528093929190818152602001838360200280828437820191505050505050919291929050505061085a565b005b34801561033357600080fd5b5061035260048036038101908080359060200190929190505050610a40565b604051808215151515815260200191505060405180910390f35b6000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161415156103c757600080fd5b7f6823b073d48d6e3a7d385eeb601452d680e74bb46afe3255a7d778f3a9b1768160405160405180910390a16000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff16ff5b6060806000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff1614151561048b57600080fd5b60026003818054806020026020016040519081016040528092919081815260200182805480156104de57602002820191906000526020600020905b815460001916815260200190600101908083116104c6575b505050505091508080548060200260200160405190810160405280929190818152602001828054801561053057602002820191906000526020600020905b81548152602001906001019080831161051c575b50505050509050915091509091565b6000600280549050905090565b6000600154905090565b60008060008073ffffffffffffffffffffffffffffffffffffffff166000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff161480156105e45750600073ffffffffffffffffffffffffffffffffffffffff168473ffffffffffffffffffffffffffffffffffffffff1614155b15156105ef57600080fd5b836000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff16021790555084600181905550600092505b855183101561075357858381518110151561065257fe5b9060200101517f010000000000000000000000000000000000000000000000000000000000000090047f0100000000000000000000000000000000000000000000000000000000000000027f0100000000000000000000000000000000000000000000000000000000000000900460ff169150602082111580156106dc5750855182600185010111155b15156106e757600080fd5b8260218701015190506020821015610714576001600883026101000360019060020a020360010219811690505b6002819080600181540180825580915050906001820390600052602060002001600090919290919091509060001916905550816001018301925061063b565b6002805490506003816107669190610b05565b50505050505050565b6000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161480156107d157506107cf82610a40565b155b80156107e1575060028054905081105b15156107ec57600080fd5b6107f582610acf565b60038181548110151561080457fe5b9060005260206000200160008154809291906001019190505550817f84a5508ca0d85b42a876e75a9126f3ae7b43617ce60b170bf8805d34630bc654826040518082815260200191505060405180910390a25050565b60008060009054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161480156108b9575081518351145b15156108c457600080fd5b600090505b8251811015610a3b576108f283828151811015156108e357fe5b90602001906020020151610a40565b806109195750600280549050828281518110151561090c57fe5b9060200190602002015110155b1561096757828181518110151561092c57fe5b906020019060200201517f7adeda043a07ca35988f05f4c82eb8d607713faeba7acc6c3ecb6a30a0be2ee160405160405180910390a2610a2e565b610987838281518110151561097857fe5b90602001906020020151610acf565b6003828281518110151561099757fe5b906020019060200201518154811015156109ad57fe5b906000526020600020016000815480929190600101919050555082818151811015156109d557fe5b906020019060200201517f84a5508ca0d85b42a876e75a9126f3ae7b43617ce60b170bf8805d34630bc6548383815181101515610a0e57fe5b906020019060200201516040518082815260200191505060405180910390a25b80806001019150506108c9565b505050565b60008060009054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff16141515610a9d57600080fd5b60018060ff8416600460006008879060020a90048152602001908152602001600020549060020a900416149050919050565b60ff811660019060020a02600460006008849060020a900481526020019081526020016000206000828254179250508190555050565b815481835581811115610b2c57818360005260206000209182019101610b2b9190610b31565b5b505050565b610b5391905b80821115610b4f576000816000905550600101610b37565b5090565b905600a165627a7a7230582083cdbd53bd85349aa434419ce563f230d388f4c187871290d1c9ae68c69a81090029'
+
+VOTING_FACTORY_ABI = '[{"constant":true,"inputs":[],"name":"implementation","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"packedCandidates","type":"bytes"},{"name":"ownerId","type":"uint256"}],"name":"createVoting","outputs":[{"name":"voting","type":"address"}],"payable":false,"stateMutability":"nonpayable","type":"function"},{"inputs":[],"payable":false,"stateMutability":"nonpayable","type":"constructor"},{"anonymous":false,"inputs":[{"indexed":false,"name":"voting","type":"address"}],"name":"VotingCreated","type":"event"}]'
+
+VOTING_FACTORY_BYTECODE = '0x608060405234801561001057600080fd5b50600061001b61009a565b808060200183815260200182810382526000815260200160200192505050604051809103906000f080158015610055573d6000803e3d6000fd5b506000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff1602179055506100aa565b604051610e69806104c483390190565b61040b806100b96000396000f30060806040526004361061004c576000357c0100000000000000000000000000000000000000000000000000000000900463ffffffff1680635c60da1b146100515780638f36bcaf146100a8575b600080fd5b34801561005d57600080fd5b5061006661015b565b604051808273ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff16815260200191505060405180910390f35b3480156100b457600080fd5b50610119600480360381019080803590602001908201803590602001908080601f016020809104026020016040519081016040528093929190818152602001838380828437820191505050505050919291929080359060200190929190505050610180565b604051808273ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff16815260200191505060405180910390f35b6000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1681565b6000806000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff166c010000000000000000000000000290506040517f3d602d80600a3d3981f3363d3d373d3d3d363d7300000000000000000000000081528160148201527f5af43d82803e903d91602b57fd5bf3000000000000000000000000000000000060288201526037816000f0925050600073ffffffffffffffffffffffffffffffffffffffff168273ffffffffffffffffffffffffffffffffffffffff161415151561024d57600080fd5b8173ffffffffffffffffffffffffffffffffffffffff1663953244118585336040518463ffffffff167c010000000000000000000000000000000000000000000000000000000002815260040180806020018481526020018373ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff168152602001828103825285818151815260200191508051906020019080838360005b8381101561030f5780820151818401526020810190506102f4565b50505050905090810190601f16801561033c5780820380516001836020036101000a031916815260200191505b50945050505050600060405180830381600087803b15801561035d57600080fd5b505af1158015610371573d6000803e3d6000fd5b505050507f8d59e26d1a30e4599d9266c3cc51905634249f88e542c997ce6769cf0c91e1db82604051808273ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff16815260200191505060405180910390a150929150505600a165627a7a72305820671c745b8db050a663f6898aafff26c0bcce15e78e28a9c73df6a62e51526ebc0029608060405234801561001057600080fd5b50604051610e69380380610e6983398101806040528101908080518201929190602001805190602001909291905050506000806000336000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff1602179055508360018190555060009150600090505b84518110156102375760007f01000000000000000000000000000000000000000000000000000000000000000285828151811015156100d057fe5b9060200101517f010000000000000000000000000000000000000000000000000000000000000090047f0100000000000000000000000000000000000000000000000000000000000000027effffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff19161415610185576002839080600181540180825580915050906001820390600052602060002001600090919290919091509060001916905550600060010292506000915061022a565b60208210151561019457600080fd5b6008820285828151811015156101a657fe5b9060200101517f010000000000000000000000000000000000000000000000000000000000000090047f0100000000000000000000000000000000000000000000000000000000000000027effffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff1916600019169060020a90048317925081806001019250505b8080600101915050610095565b600283908060018154018082558091505090600182039060005260206000200160009091929091909150906000191690555060028054905060038161027c9190610287565b5050505050506102d8565b8154818355818111156102ae578183600052602060002091820191016102ad91906102b3565b5b505050565b6102d591905b808211156102d15760008160009055506001016102b9565b5090565b90565b610b82806102e76000396000f30060806040526004361061008e576000357c0100000000000000000000000000000000000000000000000000000000900463ffffffff16806341c0e1b5146100935780634717f97c146100aa5780637a84d13e1461015e578063893d20e81461018957806395324411146101b4578063b384abef14610247578063ca09dd791461027e578063ecca031f14610327575b600080fd5b34801561009f57600080fd5b506100a861036c565b005b3480156100b657600080fd5b506100bf61042d565b604051808060200180602001838103835285818151815260200191508051906020019060200280838360005b838110156101065780820151818401526020810190506100eb565b50505050905001838103825284818151815260200191508051906020019060200280838360005b8381101561014857808201518184015260208101905061012d565b5050505090500194505050505060405180910390f35b34801561016a57600080fd5b5061017361053f565b6040518082815260200191505060405180910390f35b34801561019557600080fd5b5061019e61054c565b6040518082815260200191505060405180910390f35b3480156101c057600080fd5b50610245600480360381019080803590602001908201803590602001908080601f016020809104026020016040519081016040528093929190818152602001838380828437820191505050505050919291929080359060200190929190803573ffffffffffffffffffffffffffffffffffffffff169060200190929190505050610556565b005b34801561025357600080fd5b5061027c600480360381019080803590602001909291908035906020019092919050505061076f565b005b34801561028a57600080fd5b50610325600480360381019080803590602001908201803590602001908080602002602001604051908101604052809392919081815260200183836020028082843782019150505050505091929192908035906020019082018035906020019080806020026020016040519081016040528093929190818152602001838360200280828437820191505050505050919291929050505061085a565b005b34801561033357600080fd5b5061035260048036038101908080359060200190929190505050610a40565b604051808215151515815260200191505060405180910390f35b6000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161415156103c757600080fd5b7f6823b073d48d6e3a7d385eeb601452d680e74bb46afe3255a7d778f3a9b1768160405160405180910390a16000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff16ff5b6060806000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff1614151561048b57600080fd5b60026003818054806020026020016040519081016040528092919081815260200182805480156104de57602002820191906000526020600020905b815460001916815260200190600101908083116104c6575b505050505091508080548060200260200160405190810160405280929190818152602001828054801561053057602002820191906000526020600020905b81548152602001906001019080831161051c575b50505050509050915091509091565b6000600280549050905090565b6000600154905090565b60008060008073ffffffffffffffffffffffffffffffffffffffff166000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff161480156105e45750600073ffffffffffffffffffffffffffffffffffffffff168473ffffffffffffffffffffffffffffffffffffffff1614155b15156105ef57600080fd5b836000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff16021790555084600181905550600092505b855183101561075357858381518110151561065257fe5b9060200101517f010000000000000000000000000000000000000000000000000000000000000090047f0100000000000000000000000000000000000000000000000000000000000000027f0100000000000000000000000000000000000000000000000000000000000000900460ff169150602082111580156106dc5750855182600185010111155b15156106e757600080fd5b8260218701015190506020821015610714576001600883026101000360019060020a020360010219811690505b6002819080600181540180825580915050906001820390600052602060002001600090919290919091509060001916905550816001018301925061063b565b6002805490506003816107669190610b05565b50505050505050565b6000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161480156107d157506107cf82610a40565b155b80156107e1575060028054905081105b15156107ec57600080fd5b6107f582610acf565b60038181548110151561080457fe5b9060005260206000200160008154809291906001019190505550817f84a5508ca0d85b42a876e75a9126f3ae7b43617ce60b170bf8805d34630bc654826040518082815260200191505060405180910390a25050565b60008060009054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161480156108b9575081518351145b15156108c457600080fd5b600090505b8251811015610a3b576108f283828151811015156108e357fe5b90602001906020020151610a40565b806109195750600280549050828281518110151561090c57fe5b9060200190602002015110155b1561096757828181518110151561092c57fe5b906020019060200201517f7adeda043a07ca35988f05f4c82eb8d607713faeba7acc6c3ecb6a30a0be2ee160405160405180910390a2610a2e565b610987838281518110151561097857fe5b90602001906020020151610acf565b6003828281518110151561099757fe5b906020019060200201518154811015156109ad57fe5b906000526020600020016000815480929190600101919050555082818151811015156109d557fe5b906020019060200201517f84a5508ca0d85b42a876e75a9126f3ae7b43617ce60b170bf8805d34630bc6548383815181101515610a0e57fe5b906020019060200201516040518082815260200191505060405180910390a25b80806001019150506108c9565b505050565b60008060009054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff16141515610a9d57600080fd5b60018060ff8416600460006008879060020a90048152602001908152602001600020549060020a900416149050919050565b60ff811660019060020a02600460006008849060020a900481526020019081526020016000206000828254179250508190555050565b815481835581811115610b2c57818360005260206000209182019101610b2b9190610b31565b5b505050565b610b5391905b80821115610b4f576000816000905550600101610b37565b5090565b905600a165627a7a7230582083cdbd53bd85349aa434419ce563f230d388f4c187871290d1c9ae68c69a81090029'
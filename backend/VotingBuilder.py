@@ -7,11 +7,15 @@ from backend.VotingManager import VotingManager, Voting
 class VotingBuilder:
     __candidate_list: List[str]
 
-    def __init__(self, owner: int, manager: VotingManager):
+    def __init__(self, owner: int, manager: VotingManager, candidates: Optional[List[str]] = None):
         self.__owner = owner
         self.__manager = manager
-        self.__counter = -1
-        self.__candidate_list = []
+        self.__candidate_list = list(candidates or [])
+        self.__counter = len(self.__candidate_list) - 1
+
+    @property
+    def candidates(self) -> List[str]:
+        return list(self.__candidate_list)
 
     def get_voting(self) -> Optional[Voting]:
         if len(self.__candidate_list) == 0:
@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from backend.VotingContract import VotingContract
+
+
+class CachedVoting(NamedTuple):
+    contract: VotingContract
+    candidates: Tuple[str, ...]
+
+
+class VotingCache:
+    """Thread-safe LRU cache of restored contracts keyed by address.
+
+    Candidate lists never change after the constructor, so they are cached together with the contract wrapper.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self.__capacity = capacity
+        self.__entries: 'OrderedDict[str, CachedVoting]' = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, address: str) -> Optional[CachedVoting]:
+        with self.__lock:
+            entry = self.__entries.get(address)
+            if entry is None:
+                self.misses += 1
+                return
+            self.__entries.move_to_end(address)
+            self.hits += 1
+            return entry
+
+    def put(self, entry: CachedVoting) -> None:
+        with self.__lock:
+            self.__entries[entry.contract.address] = entry
+            self.__entries.move_to_end(entry.contract.address)
+            while len(self.__entries) > self.__capacity:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, address: str) -> None:
+        with self.__lock:
+            self.__entries.pop(address, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {'size': len(self.__entries), 'capacity': self.__capacity,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
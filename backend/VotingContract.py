@@ -1,115 +1,414 @@
+import json
 import logging
 from functools import wraps
-from typing import Tuple, List, Callable, Optional
+import itertools
+import threading
+import time
+from typing import Tuple, List, Callable, Optional, Any, Dict, Sequence, Union
 
-from web3 import Web3, HTTPProvider
+from eth_abi import decode_abi
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector
+from hexbytes import HexBytes
+from web3 import Web3
 from web3.eth import Contract
+from web3.middleware.pythonic import receipt_formatter
+from web3.datastructures import AttributeDict
+from web3.providers import BaseProvider
+
+from backend.Metrics import METRICS
+from backend.NonceManager import NonceManager
+from backend.ProviderPool import ProviderPool
+from backend.ReceiptTracker import ReceiptTracker, PendingTransaction, RECEIPT_TIMEOUT
+from backend.VotingArtifacts import VOTING_ABI, VOTING_BYTECODE, VOTING_FACTORY_ABI, VOTING_FACTORY_BYTECODE
 
 logger = logging.getLogger(__name__)
 
+# a block number or 'latest'
+BlockIdentifier = Union[int, str]
+_VOTING_ABI_ENTRIES = json.loads(VOTING_ABI)
+
+CONTRACT_CALL_SECONDS = METRICS.histogram('voting_contract_call_seconds', 'Duration of contract and factory calls',
+                                          ('function', 'address', 'handler'))
+CONTRACT_ERRORS = METRICS.counter('voting_contract_errors_total', 'Contract and factory calls that raised',
+                                  ('function', 'address', 'handler'))
+TRANSACTION_SECONDS = METRICS.histogram('voting_transaction_seconds', 'Time from sending a transaction to its receipt',
+                                        ('function', 'address', 'handler'), log_slow=False)
+TRANSACTION_FAILURES = METRICS.counter('voting_transaction_failures_total',
+                                       'Transactions that could not be sent, reverted or were not mined in time',
+                                       ('function', 'address', 'handler'))
+
+
 def wrap_vm_exception(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
+        # contract methods are labelled with their voting, factory calls with the voting they return; addresses
+        # users typed in only become labels once they turn out to be one of our votings, keeping the series bounded
+        labels = {'function': func.__name__, 'address': getattr(args[0], 'address', ''),
+                  'handler': METRICS.current_handler()}
+        started = time.monotonic()
+        result = None
         try:
-            return func(*args, **kwargs)
+            result = func(*args, **kwargs)
+            return result
         except Exception as e:
+            CONTRACT_ERRORS.inc(**labels)
             logger.error(str(e))
+        finally:
+            if isinstance(result, VotingContract):
+                labels['address'] = result.address
+            CONTRACT_CALL_SECONDS.observe(time.monotonic() - started, **labels)
 
     return wrapper
 
 
 class VotingContract:
     address: str
+    admin: str
+    emits_events: bool
 
-    def __init__(self, await_transaction: Callable, contract_api: Contract):
-        self.__await_transaction = await_transaction
+    def __init__(self, send_transaction: Callable[[str, Any], PendingTransaction], contract_api: Contract,
+                 batch_call: Callable[[str, List[Tuple[str, str]], BlockIdentifier], List[bytes]], admin: str,
+                 code: bytes):
+        self.__send_transaction = send_transaction
+        self.__batch_call = batch_call
         self._contract_api = contract_api
         self.address = contract_api.address
+        # the contract only answers to the account that deployed it
+        self.admin = admin
+        # contracts deployed from the original voting.sol lack some functions and events
+        self.emits_events = self._code_has_event(code, 'Voted')
+        self.supports_vote_batch = self._code_has_function(code, 'voteBatch')
+        self.supports_get_results = self._code_has_function(code, 'getResults')
 
-    def _get_candidate(self, candidate_index: int) -> bytes:
-        if not (0 <= candidate_index < self._contract_api.functions.getNumberOfCandidates().call()):
-            raise IndexError('invalid candidate_index')
-        return self._contract_api.functions.getCandidate(candidate_index).call()
+    @staticmethod
+    def _find_abi(abi_type: str, name: str) -> dict:
+        # always the current voting.sol, contract_api may use the legacy ABI
+        return next(entry for entry in _VOTING_ABI_ENTRIES if entry['type'] == abi_type and entry['name'] == name)
 
-    def _get_candidate_votes(self, candidate_index: int) -> int:
-        if not (0 <= candidate_index < self._contract_api.functions.getNumberOfCandidates().call()):
-            raise IndexError('invalid candidate_index')
-        return self._contract_api.functions.getCandidateVotes(candidate_index).call()
+    @staticmethod
+    def _code_has_event(code: bytes, name: str) -> bool:
+        # the event signature hash is pushed as a literal before LOG, so it shows up in the code of emitting contracts
+        return event_abi_to_log_topic(VotingContract._find_abi('event', name)) in code
+
+    @staticmethod
+    def _code_has_function(code: bytes, name: str) -> bool:
+        # same for function selectors in the dispatcher
+        return function_abi_to_4byte_selector(VotingContract._find_abi('function', name)) in code
+
+    def _encode_call(self, fn_name: str, *args) -> Tuple[str, str]:
+        return self.address, self._contract_api.encodeABI(fn_name=fn_name, args=list(args))
+
+    def _get_results(self, block_identifier: BlockIdentifier = 'latest') -> Tuple[List[bytes], List[int]]:
+        names, votes = self._contract_api.functions.getResults().call({'from': self.admin},
+                                                                       block_identifier=block_identifier)
+        return [name.rstrip(b'\x00') for name in names], votes
+
+    def _get_candidates_batch(self, count: int, with_votes: bool,
+                              block_identifier: BlockIdentifier = 'latest') -> Tuple[List[bytes], List[int]]:
+        # legacy contracts without getResults: all per-candidate reads go out in a single round trip
+        calls = [self._encode_call('getCandidate', i) for i in range(count)]
+        if with_votes:
+            calls += [self._encode_call('getCandidateVotes', i) for i in range(count)]
+        raw = self.__batch_call(self.admin, calls, block_identifier)
+        candidates = [decode_abi(['bytes'], r)[0] for r in raw[:count]]
+        votes = [decode_abi(['uint256'], r)[0] for r in raw[count:]]
+        return candidates, votes
 
     @wrap_vm_exception
-    def get_candidates_and_votes(self) -> Optional[List[Tuple[bytes, int]]]:
-        result: List[Tuple[bytes, int]] = []
-        for i in range(self._contract_api.functions.getNumberOfCandidates().call()):
-            candidate = self._get_candidate(i)
-            votes = self._get_candidate_votes(i)
-            result.append((candidate, votes))
-        return result
+    def get_candidates_and_votes(self, block_identifier: BlockIdentifier = 'latest') \
+            -> Optional[List[Tuple[bytes, int]]]:
+        if self.supports_get_results:
+            return list(zip(*self._get_results(block_identifier)))
+        count = self._contract_api.functions.getNumberOfCandidates().call(block_identifier=block_identifier)
+        candidates, votes = self._get_candidates_batch(count, with_votes=True, block_identifier=block_identifier)
+        return list(zip(candidates, votes))
 
     @wrap_vm_exception
     def get_candidates(self) -> Optional[List[bytes]]:
-        return [self._get_candidate(i) for i in range(self._contract_api.functions.getNumberOfCandidates().call())]
+        if self.supports_get_results:
+            return self._get_results()[0]
+        count = self._contract_api.functions.getNumberOfCandidates().call()
+        candidates, _ = self._get_candidates_batch(count, with_votes=False)
+        return candidates
 
-    def _begin_vote(self, voter_id: int, candidate_index: int) -> bytes:
+    def _begin_vote(self, voter_id: int, candidate_index: int) -> PendingTransaction:
         if not (0 <= candidate_index < self._contract_api.functions.getNumberOfCandidates().call()):
             raise IndexError('invalid candidate_index')
-        return self._contract_api.functions.vote(voter_id, candidate_index).transact()
+        return self.__send_transaction(self.admin, self._contract_api.functions.vote(voter_id, candidate_index))
 
-    def wait_for_transaction(self, transaction_hash: bytes) -> None:
-        # TODO: Do we need to do smth with tx_receipt?
-        tx_receipt = self.__await_transaction(transaction_hash)
+    @staticmethod
+    def wait_for_transaction(pending: PendingTransaction) -> bool:
+        pending.result(RECEIPT_TIMEOUT)
+        return pending.succeeded()
 
     @wrap_vm_exception
     def has_voted(self, voter_id: int) -> Optional[bool]:
-        return self._contract_api.functions.hasVoted(voter_id).call()
+        return self._contract_api.functions.hasVoted(voter_id).call({'from': self.admin})
 
     @wrap_vm_exception
     def vote(self, voter_id: int, candidate_index: int) -> Optional[bool]:
-        self.wait_for_transaction(self._begin_vote(voter_id, candidate_index))
-        return True
+        return self.wait_for_transaction(self._begin_vote(voter_id, candidate_index))
 
-    def _begin_kill(self) -> bytes:
-        return self._contract_api.functions.kill().transact()
+    @wrap_vm_exception
+    def submit_vote(self, voter_id: int, candidate_index: int) -> Optional[PendingTransaction]:
+        """Same as vote, but returns right after the transaction is sent"""
+        return self._begin_vote(voter_id, candidate_index)
+
+    def _begin_vote_batch(self, voter_ids: List[int], candidate_indexes: List[int]) -> PendingTransaction:
+        if not self.supports_vote_batch:
+            raise ValueError(f'{self.address} has no voteBatch')
+        return self.__send_transaction(self.admin,
+                                       self._contract_api.functions.voteBatch(voter_ids, candidate_indexes))
+
+    @wrap_vm_exception
+    def submit_vote_batch(self, voter_ids: List[int], candidate_indexes: List[int]) -> Optional[PendingTransaction]:
+        """Votes for many voters in one transaction; voters that already voted are skipped, not reverted"""
+        return self._begin_vote_batch(voter_ids, candidate_indexes)
+
+    def get_vote_batch_outcome(self, receipt: dict) -> Dict[int, bool]:
+        """Maps every voter of a mined voteBatch to whether their vote was counted"""
+        outcome: Dict[int, bool] = {}
+        voted_topic = event_abi_to_log_topic(self._find_abi('event', 'Voted'))
+        skipped_topic = event_abi_to_log_topic(self._find_abi('event', 'VoteSkipped'))
+        for log in receipt['logs']:
+            if log['address'] != self.address or len(log['topics']) < 2:
+                continue
+            voter_id = int.from_bytes(log['topics'][1], 'big')
+            if log['topics'][0] == voted_topic:
+                outcome[voter_id] = True
+            elif log['topics'][0] == skipped_topic:
+                outcome[voter_id] = False
+        return outcome
+
+    def _begin_kill(self) -> PendingTransaction:
+        return self.__send_transaction(self.admin, self._contract_api.functions.kill())
 
     @wrap_vm_exception
     def kill(self, callie_id: int) -> Optional[bool]:
         # TODO: consider moving this validation into the contract
         if callie_id != self._contract_api.functions.getOwner().call():
             return False
-        self.wait_for_transaction(self._begin_kill())
-        return True
+        return self.wait_for_transaction(self._begin_kill())
+
+    @wrap_vm_exception
+    def submit_kill(self, callie_id: int) -> Optional[PendingTransaction]:
+        """Same as kill, but returns right after the transaction is sent; None means callie is not the owner"""
+        if callie_id != self._contract_api.functions.getOwner().call():
+            return
+        return self._begin_kill()
 
 
 class VotingContractFactory:
     w3: Web3
-    url: str
-    address: Tuple[int, int, int, int]
-    port: int
-    _abi = '[{"constant":true,"inputs":[{"name":"index","type":"uint256"}],"name":"getCandidate","outputs":[{"name":"","type":"bytes"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[],"name":"kill","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"getNumberOfCandidates","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"index","type":"uint256"}],"name":"getCandidateVotes","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"getOwner","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"voterId","type":"uint256"},{"name":"candidateIndex","type":"uint256"}],"name":"vote","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"voterId","type":"uint256"}],"name":"hasVoted","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"inputs":[{"name":"candidates","type":"bytes"},{"name":"ownerId","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"}]'
-    _bytecode = '0x608060405234801561001057600080fd5b50604051610a32380380610a3283398101806040528101908080518201929190602001805190602001909291905050506000336000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff16021790555081600481905550600260006040519080825280601f01601f1916602001820160405280156100bf5781602001602082028038833980820191505090505b5090806001815401808255809150509060018203906000526020600020016000909192909190915090805190602001906100fa92919061036b565b5050600090505b82518110156103635760007f010000000000000000000000000000000000000000000000000000000000000002838281518110151561013c57fe5b9060200101517f010000000000000000000000000000000000000000000000000000000000000090047f0100000000000000000000000000000000000000000000000000000000000000027effffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff1916141561022757600260006040519080825280601f01601f1916602001820160405280156101e55781602001602082028038833980820191505090505b50908060018154018082558091505090600182039060005260206000200160009091929091909150908051906020019061022092919061036b565b5050610356565b600260016002805490500381548110151561023e57fe5b90600052602060002001838281518110151561025657fe5b9060200101517f010000000000000000000000000000000000000000000000000000000000000090047f01000000000000000000000000000000000000000000000000000000000000000290808054603f811680603e81146102d4576002830184556001831615156102c6578192505b6001600284040193506102ee565b83600052602060002060ff19841681556041855560209450505b50505090600182038154600116156103155790600052602060002090602091828204019190065b90919290919091601f036101000a81548160ff021916907f010000000000000000000000000000000000000000000000000000000000000084040217905550505b8080600101915050610101565b505050610410565b828054600181600116156101000203166002900490600052602060002090601f016020900481019282601f106103ac57805160ff19168380011785556103da565b828001600101855582156103da579182015b828111156103d95782518255916020019190600101906103be565b5b5090506103e791906103eb565b5090565b61040d91905b808211156104095760008160009055506001016103f1565b5090565b90565b6106138061041f6000396000f300608060405260043610610083576000357c0100000000000000000000000000000000000000000000000000000000900463ffffffff16806335b8e8201461008857806341c0e1b51461012e5780637a84d13e14610145578063866163c014610170578063893d20e8146101b1578063b384abef146101dc578063ecca031f14610213575b600080fd5b34801561009457600080fd5b506100b360048036038101908080359060200190929190505050610258565b6040518080602001828103825283818151815260200191508051906020019080838360005b838110156100f35780820151818401526020810190506100d8565b50505050905090810190601f1680156101205780820380516001836020036101000a031916815260200191505b509250505060405180910390f35b34801561013a57600080fd5b5061014361036e565b005b34801561015157600080fd5b5061015a610403565b6040518082815260200191505060405180910390f35b34801561017c57600080fd5b5061019b60048036038101908080359060200190929190505050610410565b6040518082815260200191505060405180910390f35b3480156101bd57600080fd5b506101c6610488565b6040518082815260200191505060405180910390f35b3480156101e857600080fd5b506102116004803603810190808035906020019092919080359060200190929190505050610492565b005b34801561021f57600080fd5b5061023e60048036038101908080359060200190929190505050610562565b604051808215151515815260200191505060405180910390f35b60606000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161415156102b557600080fd5b6002828154811015156102c457fe5b906000526020600020018054600181600116156101000203166002900480601f0160208091040260200160405190810160405280929190818152602001828054600181600116156101000203166002900480156103625780601f1061033757610100808354040283529160200191610362565b820191906000526020600020905b81548152906001019060200180831161034557829003601f168201915b50505050509050919050565b6000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161415156103c957600080fd5b6000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff16ff5b6000600280549050905090565b60008060009054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff1614151561046d57600080fd5b60016000838152602001908152602001600020549050919050565b6000600454905090565b6000809054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161480156104f457506104f282610562565b155b8015610504575060028054905081105b151561050f57600080fd5b60016003600084815260200190815260200160002060006101000a81548160ff02191690831515021790555060016000828152602001908152602001600020600081548092919060010191905055505050565b60008060009054906101000a900473ffffffffffffffffffffffffffffffffffffffff1673ffffffffffffffffffffffffffffffffffffffff163373ffffffffffffffffffffffffffffffffffffffff161415156105bf57600080fd5b6003600083815260200190815260200160002060009054906101000a900460ff1690509190505600a165627a7a72305820f8fc6dcd2fcf20cf832cb62f3242e11304f91e63804754faa2cce79e213694610029'
-
-    def __init__(self, address: Tuple[int, int, int, int], port: int):
-        self.port = port
-        self.address = address
-        addr = '.'.join((str(x) for x in address))
-        self.url = f'http://{addr}:{port}'
-        self.w3 = Web3(HTTPProvider(self.url))
-        self.w3.eth.defaultAccount = self.w3.eth.accounts[0]
+    provider_pool: ProviderPool
+    _abi = VOTING_ABI
+    _bytecode = VOTING_BYTECODE
+    # votings deployed from the original solidity contract, which read candidates one by one
+    _legacy_abi = '[{"constant":true,"inputs":[{"name":"index","type":"uint256"}],"name":"getCandidate","outputs":[{"name":"","type":"bytes"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[],"name":"kill","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"getNumberOfCandidates","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"index","type":"uint256"}],"name":"getCandidateVotes","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"getOwner","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"voterId","type":"uint256"},{"name":"candidateIndex","type":"uint256"}],"name":"vote","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"voterId","type":"uint256"}],"name":"hasVoted","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"inputs":[{"name":"candidates","type":"bytes"},{"name":"ownerId","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"}]'
+
+    _clone_factory_abi = VOTING_FACTORY_ABI
+    # runtime code of an EIP-1167 minimal proxy is prefix + implementation address + suffix
+    _clone_prefix = bytes.fromhex('363d3d373d3d3d363d73')
+    _clone_suffix = bytes.fromhex('5af43d82803e903d91602b57fd5bf3')
+
+    def __init__(self, endpoints: Sequence[Union[str, BaseProvider]], admin_accounts: Optional[List[str]] = None,
+                 clone_factory_address: Optional[str] = None, read_strategy: str = 'round_robin',
+                 local_nonces: bool = True):
+        # the first endpoint is the primary node holding the admin accounts, the rest only serve reads
+        self.provider_pool = ProviderPool(endpoints, read_strategy)
+        self.w3 = Web3(self.provider_pool)
+        # new votings are spread over the admin accounts, every voting keeps using the account that deployed it
+        self.admin_accounts = admin_accounts or [self.w3.eth.accounts[0]]
+        self.w3.eth.defaultAccount = self.admin_accounts[0]
+        self.__next_admin = itertools.cycle(self.admin_accounts)
+        self.__next_admin_lock = threading.Lock()
+        # local nonces only work while this process is the only one sending from the admin accounts, processes
+        # sharing them leave the numbering to the node instead
+        self._nonces = None
+        if local_nonces:
+            self._nonces = NonceManager(lambda account: self.w3.eth.getTransactionCount(account, 'pending'))
+        self._receipt_tracker = ReceiptTracker(self._get_receipts)
+        # with a VotingFactory deployed, votings are cheap clones of its template instead of full deployments
+        self._clone_factory = None
+        if clone_factory_address:
+            self._clone_factory = self.w3.eth.contract(address=clone_factory_address,
+                                                       abi=VotingContractFactory._clone_factory_abi)
+        # the factory's template never changes
+        self.__implementation: Optional[str] = None
+        self.__implementation_code: Dict[str, bytes] = {}
+
+    @property
+    def uses_clones(self) -> bool:
+        return self._clone_factory is not None
+
+    @wrap_vm_exception
+    def deploy_clone_factory(self) -> Optional[str]:
+        """Deploys a VotingFactory from the first admin account and switches to clone mode, returns its address"""
+        factory = self.w3.eth.contract(abi=VotingContractFactory._clone_factory_abi, bytecode=VOTING_FACTORY_BYTECODE)
+        pending = self._send_transaction(self.admin_accounts[0], factory.constructor())
+        if not VotingContract.wait_for_transaction(pending):
+            return
+        self._clone_factory = self.w3.eth.contract(address=pending.result().contractAddress,
+                                                   abi=VotingContractFactory._clone_factory_abi)
+        self.__implementation = None
+        return self._clone_factory.address
 
     @wrap_vm_exception
     def create(self, *contract_args, **contract_kwargs) -> Optional[VotingContract]:
+        """Deploys a new voting; in clone mode the arguments go to VotingFactory.createVoting instead of
+        the constructor"""
+        with self.__next_admin_lock:
+            admin = next(self.__next_admin)
+        if self._clone_factory:
+            return self._create_clone(admin, *contract_args, **contract_kwargs)
         contract = self.w3.eth.contract(abi=VotingContractFactory._abi, bytecode=VotingContractFactory._bytecode)
-        tx_hash = contract.constructor(*contract_args, **contract_kwargs).transact()
-        tx_receipt = self.w3.eth.waitForTransactionReceipt(tx_hash)
-        return self._init_contract(tx_receipt.contractAddress)
+        pending = self._send_transaction(admin, contract.constructor(*contract_args, **contract_kwargs))
+        if not VotingContract.wait_for_transaction(pending):
+            return
+        return self._init_contract(pending.result().contractAddress, admin, HexBytes(VotingContractFactory._bytecode))
+
+    def _create_clone(self, admin: str, *create_args, **create_kwargs) -> Optional[VotingContract]:
+        pending = self._send_transaction(admin, self._clone_factory.functions.createVoting(*create_args,
+                                                                                           **create_kwargs))
+        if not VotingContract.wait_for_transaction(pending):
+            return
+        created = self._clone_factory.events.VotingCreated().processReceipt(pending.result())
+        if not created:
+            raise ValueError(f'no VotingCreated event in {pending.transaction_hash.hex()}')
+        if self.__implementation is None:
+            self.__implementation = self._clone_factory.functions.implementation().call()
+        return self._init_contract(created[0]['args']['voting'], admin,
+                                   self._get_implementation_code(self.__implementation))
+
+    def _get_implementation_code(self, implementation: str) -> bytes:
+        # templates are never killed, so their code can be cached for good
+        if implementation not in self.__implementation_code:
+            self.__implementation_code[implementation] = self.w3.eth.getCode(implementation)
+        return self.__implementation_code[implementation]
+
+    def _resolve_clone(self, code: bytes) -> bytes:
+        """Returns the code that actually runs at an address: the template's code for minimal proxies"""
+        prefix, suffix = VotingContractFactory._clone_prefix, VotingContractFactory._clone_suffix
+        if len(code) != len(prefix) + 20 + len(suffix) or not (code.startswith(prefix) and code.endswith(suffix)):
+            return code
+        implementation = Web3.toChecksumAddress('0x' + bytes(code[len(prefix):len(prefix) + 20]).hex())
+        return self._get_implementation_code(implementation)
+
+    def _send_transaction(self, sender: str, transactable: Any) -> PendingTransaction:
+        """Sends a contract function or constructor transaction with a locally allocated nonce, or without one
+        when the node assigns them"""
+        labels = {'function': getattr(transactable, 'fn_name', 'constructor'),
+                  'address': getattr(transactable, 'address', None) or '', 'handler': METRICS.current_handler()}
+        if self._nonces is None:
+            nonce = None
+            transaction = {'from': sender}
+        else:
+            nonce = self._nonces.allocate(sender)
+            transaction = {'from': sender, 'nonce': nonce}
+        sent = time.monotonic()
+        try:
+            transaction_hash = transactable.transact(transaction)
+        except Exception:
+            TRANSACTION_FAILURES.inc(**labels)
+            if nonce is not None:
+                self._nonces.release(sender, nonce)
+                self._nonces.resync(sender)
+            raise
+        pending = self._receipt_tracker.track(transaction_hash)
+        if nonce is not None:
+            pending.add_done_callback(lambda mined: self._on_transaction_done(sender, nonce, mined))
+        pending.add_done_callback(lambda mined: self._record_transaction(labels, sent, mined))
+        return pending
+
+    @staticmethod
+    def _record_transaction(labels: Dict[str, str], sent: float, pending: PendingTransaction) -> None:
+        TRANSACTION_SECONDS.observe(time.monotonic() - sent, **labels)
+        if not pending.succeeded():
+            TRANSACTION_FAILURES.inc(**labels)
 
-    def _init_contract(self, address):
-        contract_instance = self.w3.eth.contract(address=address, abi=VotingContractFactory._abi)
-        return VotingContract(self.w3.eth.waitForTransactionReceipt, contract_instance)
+    def _on_transaction_done(self, sender: str, nonce: int, pending: PendingTransaction) -> None:
+        if pending.exception() is None:
+            self._nonces.confirm(sender, nonce)
+            return
+        try:
+            if self.w3.eth.getTransaction(pending.transaction_hash) is not None:
+                # still waiting in the pool, it keeps the nonce
+                return
+            logger.warning(f'transaction {pending.transaction_hash.hex()} was dropped, filling nonce {nonce}')
+            self._nonces.release(sender, nonce)
+            self._fill_nonce_gap(sender)
+        except Exception as e:
+            logger.error(f'nonce gap check of {sender} failed: {e}')
+            self._nonces.resync(sender)
+
+    def _fill_nonce_gap(self, sender: str) -> None:
+        # later transactions of the sender are stuck until the gap is used, so spend it on an empty self-transfer
+        nonce = self._nonces.allocate(sender)
+        try:
+            transaction_hash = self.w3.eth.sendTransaction({'from': sender, 'to': sender, 'value': 0, 'nonce': nonce})
+        except Exception:
+            self._nonces.release(sender, nonce)
+            raise
+        self._receipt_tracker.track(transaction_hash).add_done_callback(
+            lambda mined: self._on_transaction_done(sender, nonce, mined))
+
+    @staticmethod
+    def event_abi(name: str) -> dict:
+        return VotingContract._find_abi('event', name)
+
+    def _init_contract(self, address: str, admin: str, code: bytes):
+        if VotingContract._code_has_function(code, 'getResults'):
+            abi = VotingContractFactory._abi
+        else:
+            abi = VotingContractFactory._legacy_abi
+        contract_instance = self.w3.eth.contract(address=address, abi=abi)
+        return VotingContract(self._send_transaction, contract_instance, self._batch_call, admin, code)
+
+    def _find_admin(self, address: str) -> Optional[str]:
+        if len(self.admin_accounts) == 1:
+            return self.admin_accounts[0]
+        # hasVoted reverts for everyone but the admin, so one batch tells which of our accounts deployed the voting
+        data = self.w3.eth.contract(address=address, abi=VotingContractFactory._abi).encodeABI('hasVoted', [0])
+        results = self._batch_request('eth_call', [[{'from': account, 'to': address, 'data': data}, 'latest']
+                                                   for account in self.admin_accounts], raise_errors=False)
+        for account, result in zip(self.admin_accounts, results):
+            if result is not None and len(HexBytes(result)) > 0:
+                return account
+
+    def _batch_call(self, sender: str, calls: List[Tuple[str, str]],
+                    block_identifier: BlockIdentifier = 'latest') -> List[bytes]:
+        """Sends every (to, data) pair as an eth_call inside one JSON-RPC batch request"""
+        block = Web3.toHex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+        results = self._batch_request('eth_call', [[{'from': sender, 'to': to, 'data': data}, block]
+                                                   for to, data in calls])
+        return [HexBytes(result) for result in results]
+
+    def _get_receipts(self, transaction_hashes: List[bytes]) -> List[Optional[AttributeDict]]:
+        results = self._batch_request('eth_getTransactionReceipt', [[Web3.toHex(h)] for h in transaction_hashes])
+        return [AttributeDict.recursive(receipt_formatter(r)) if r is not None else None for r in results]
+
+    def _batch_request(self, method: str, params_list: List[list], raise_errors: bool = True) -> list:
+        """Sends one JSON-RPC batch with a `method` request per params entry and returns the results in order.
+        Without raise_errors failed requests come back as None."""
+        if not params_list:
+            return []
+        results = self.provider_pool.make_batch_request(method, params_list)
+        if len(results) != len(params_list):
+            raise ValueError(f'expected {len(params_list)} batch results, got {len(results)}')
+        if raise_errors:
+            for result in results:
+                if 'error' in result:
+                    raise ValueError(result['error'])
+        return [result.get('result') for result in results]
 
     @wrap_vm_exception
     def restore_from_address(self, address: str) -> Optional[VotingContract]:
-        code = self.w3.eth.getCode(address).hex()
-        if len(code) <= 2:
-            logger.warning(f'address {address} got {code}')
+        code = self.w3.eth.getCode(address)
+        if len(code) == 0:
+            logger.warning(f'address {address} got {code.hex()}')
+            return
+        admin = self._find_admin(address)
+        if not admin:
+            logger.warning(f'address {address} is not administered by any of our accounts')
             return
-        return self._init_contract(address)
+        return self._init_contract(address, admin, self._resolve_clone(code))
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, Set, Optional, List, Iterable, Tuple
+
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from web3.utils.events import get_event_data
+
+logger = logging.getLogger(__name__)
+
+# (address, voter_id, candidate_index) of a counted vote, (address, None, None) of a finalization
+_Change = Tuple[str, Optional[int], Optional[int]]
+
+
+class _IndexedVoting:
+    def __init__(self, tallies: Optional[Dict[int, int]] = None, voters: Optional[Set[int]] = None,
+                 finalized: bool = False):
+        self.tallies = tallies or {}
+        self.voters = voters or set()
+        self.finalized = finalized
+
+    def to_json(self) -> dict:
+        return {'tallies': self.tallies, 'voters': sorted(self.voters), 'finalized': self.finalized}
+
+    @staticmethod
+    def from_json(data: dict) -> '_IndexedVoting':
+        return _IndexedVoting({int(k): v for k, v in data['tallies'].items()}, set(data['voters']), data['finalized'])
+
+
+class VotingIndexer:
+    """Follows Voted/Finalized logs of tracked votings and keeps their tallies and voter sets in memory.
+
+    Log processing is idempotent (every voter can vote once), so resuming from a checkpoint that lags
+    behind the processed logs is safe. The checkpoint is a snapshot plus a journal of the changes since, which
+    every sync only appends to; the snapshot is rewritten once the journal outgrows it.
+    """
+
+    def __init__(self, w3: Web3, voted_abi: dict, finalized_abi: dict, checkpoint_path: Optional[str] = None,
+                 poll_interval: float = 1.0, max_block_range: Optional[int] = None):
+        self.__w3 = w3
+        self.__voted_abi = voted_abi
+        self.__finalized_topic = event_abi_to_log_topic(finalized_abi)
+        self.__topics = [Web3.toHex(event_abi_to_log_topic(voted_abi)), Web3.toHex(self.__finalized_topic)]
+        self.__checkpoint_path = checkpoint_path
+        self.__journal_path = f'{checkpoint_path}.journal' if checkpoint_path else None
+        # changes in the journal and entries in the snapshot
+        self.__journaled = 0
+        self.__snapshot_size = 0
+        self.__poll_interval = poll_interval
+        self.__max_block_range = max_block_range
+        self.__votings: Dict[str, _IndexedVoting] = {}
+        self.__block = -1
+        # network reads are serialized by the sync lock, local lookups only ever take the state lock
+        self.__sync_lock = threading.Lock()
+        self.__state_lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+        self._load_checkpoint()
+
+    def _load_checkpoint(self) -> None:
+        if not self.__checkpoint_path:
+            return
+        if os.path.exists(self.__checkpoint_path):
+            with open(self.__checkpoint_path) as f:
+                data = json.load(f)
+            self.__block = data['block']
+            self.__votings = {address: _IndexedVoting.from_json(v) for address, v in data['votings'].items()}
+            self.__snapshot_size = sum(len(v.voters) + 1 for v in self.__votings.values())
+        torn = False
+        if os.path.exists(self.__journal_path):
+            with open(self.__journal_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # the last line may have been cut short by a crash
+                        torn = True
+                        continue
+                    for address in entry['tracked']:
+                        self.__votings.setdefault(address, _IndexedVoting())
+                    self._apply_changes(entry['changes'])
+                    self.__block = max(self.__block, entry['block'])
+                    self.__journaled += len(entry['tracked']) + len(entry['changes'])
+        if torn:
+            # the next entry would be appended to the torn line and be lost with it, so start a fresh journal
+            self._save_checkpoint()
+        if self.__votings:
+            logger.info(f'Resumed index of {len(self.__votings)} votings at block {self.__block}')
+
+    def _journal(self, tracked: List[str], changes: List[_Change]) -> None:
+        """Appends the changes of a sync or track call to the checkpoint journal"""
+        if not self.__checkpoint_path or not (tracked or changes):
+            return
+        with self.__state_lock:
+            block = self.__block
+        with open(self.__journal_path, 'a') as f:
+            f.write(json.dumps({'block': block, 'tracked': tracked, 'changes': changes}, separators=(',', ':')) + '\n')
+        self.__journaled += len(tracked) + len(changes)
+        if self.__journaled > max(self.__snapshot_size, 1000):
+            self._save_checkpoint()
+
+    def _save_checkpoint(self) -> None:
+        """Writes a full snapshot and empties the journal"""
+        if not self.__checkpoint_path:
+            return
+        with self.__state_lock:
+            data = {'block': self.__block,
+                    'votings': {address: v.to_json() for address, v in self.__votings.items()}}
+            self.__snapshot_size = sum(len(v.voters) + 1 for v in self.__votings.values())
+        tmp_path = f'{self.__checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.__checkpoint_path)
+        # replaying a journal over a snapshot that already has its changes is harmless, so a crash here is fine
+        open(self.__journal_path, 'w').close()
+        self.__journaled = 0
+
+    def _get_logs(self, addresses: List[str], from_block: int, to_block: int) -> Iterable[dict]:
+        step = self.__max_block_range or to_block - from_block + 1
+        for start in range(from_block, to_block + 1, step):
+            yield from self.__w3.eth.getLogs({'fromBlock': start, 'toBlock': min(start + step - 1, to_block),
+                                              'address': addresses, 'topics': [self.__topics]})
+
+    def _apply(self, logs: Iterable[dict]) -> List[_Change]:
+        """Applies the logs and returns the changes they made"""
+        changes = []
+        for log in logs:
+            if bytes(log['topics'][0]) == self.__finalized_topic:
+                changes.append((log['address'], None, None))
+            else:
+                args = get_event_data(self.__voted_abi, log)['args']
+                changes.append((log['address'], args['voterId'], args['candidateIndex']))
+        return self._apply_changes(changes)
+
+    def _apply_changes(self, changes: Iterable[_Change]) -> List[_Change]:
+        applied = []
+        with self.__state_lock:
+            for address, voter_id, candidate_index in changes:
+                voting = self.__votings.get(address)
+                if voting is None or voting.finalized:
+                    continue
+                if voter_id is None:
+                    voting.finalized = True
+                    voting.voters = set()
+                else:
+                    if voter_id in voting.voters:
+                        continue
+                    voting.voters.add(voter_id)
+                    voting.tallies[candidate_index] = voting.tallies.get(candidate_index, 0) + 1
+                applied.append((address, voter_id, candidate_index))
+        return applied
+
+    def track(self, address: str, backfill: bool = True) -> None:
+        """Starts indexing the voting; backfill replays its whole log history up to the current cursor"""
+        with self.__sync_lock:
+            with self.__state_lock:
+                if address in self.__votings:
+                    return
+                self.__votings[address] = _IndexedVoting()
+            changes = []
+            if backfill and self.__block >= 0:
+                changes = self._apply(self._get_logs([address], 0, self.__block))
+            self._journal([address], changes)
+
+    def is_tracking(self, address: str) -> bool:
+        with self.__state_lock:
+            return address in self.__votings
+
+    def sync(self) -> None:
+        with self.__sync_lock:
+            latest = self.__w3.eth.blockNumber
+            if latest <= self.__block:
+                return
+            with self.__state_lock:
+                addresses = [address for address, v in self.__votings.items() if not v.finalized]
+            applied = []
+            if addresses:
+                # blocks before the first sync were never seen, so the first pass starts from genesis
+                applied = self._apply(self._get_logs(addresses, self.__block + 1, latest))
+            with self.__state_lock:
+                self.__block = latest
+            self._journal([], applied)
+
+    def get_tallies(self, address: str) -> Optional[Dict[int, int]]:
+        with self.__state_lock:
+            voting = self.__votings.get(address)
+            if voting is None or voting.finalized:
+                return
+            return dict(voting.tallies)
+
+    def has_voted(self, address: str, voter_id: int) -> Optional[bool]:
+        with self.__state_lock:
+            voting = self.__votings.get(address)
+            if voting is None or voting.finalized:
+                return
+            return voter_id in voting.voters
+
+    def _run(self) -> None:
+        while not self.__stopped.wait(self.__poll_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f'index sync failed: {e}')
+
+    def start(self) -> None:
+        if self.__thread:
+            return
+        self.__thread = threading.Thread(target=self._run, name='voting-indexer', daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+        with self.__sync_lock:
+            self._save_checkpoint()
@@ -1,49 +1,251 @@
 import logging
-from typing import Tuple, Optional, List, Callable
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Tuple, Optional, List, Callable, Dict, Sequence, Union
 
+from web3.providers import BaseProvider
+
+from backend.VotingCache import VotingCache, CachedVoting
+from backend.ResultsCache import ResultsCache, Results
+from backend.VotingArchive import VotingArchive
 from backend.VotingContract import VotingContractFactory, VotingContract
+from backend.VotingIndexer import VotingIndexer
+from backend.ReceiptTracker import PendingTransaction, RECEIPT_TIMEOUT
+from backend.VoteAggregator import VoteAggregator
 
 logger = logging.getLogger(__name__)
 
+# every candidate name is stored in a single bytes32 slot
+CANDIDATE_NAME_BYTES = 32
+
+ResultsCallback = Callable[[Optional[List[Tuple[str, int]]]], None]
+
+def pack_candidates(candidates: List[str]) -> bytes:
+    """Encodes names as (1 byte length, name) records, the format VotingFactory.createVoting expects"""
+    encoded = [candidate.encode() for candidate in candidates]
+    return b''.join(bytes([len(name)]) + name for name in encoded)
+
+
 class Voting:
     _contract: VotingContract
+    finalized = False
 
     def __init__(self, contract: VotingContract,
-                 finalizer: Callable[[VotingContract, int], Optional[List[Tuple[str, int]]]]):
+                 finalizer: Callable[[VotingContract, int, ResultsCallback], bool],
+                 candidates: Optional[Tuple[str, ...]] = None,
+                 on_stale: Optional[Callable[[str], None]] = None,
+                 indexer: Optional[VotingIndexer] = None,
+                 aggregator: Optional[VoteAggregator] = None,
+                 results_cache: Optional[ResultsCache] = None):
         self._finalizer = finalizer
         self._contract = contract
+        self._candidates = candidates
+        self._on_stale = on_stale
+        self._indexer = indexer
+        self._aggregator = aggregator
+        self._results_cache = results_cache
+
+    def _stale(self) -> None:
+        # the contract stopped answering (most likely killed), so it must not be served from cache anymore
+        if self._on_stale:
+            self._on_stale(self.address)
 
     @property
     def address(self) -> str:
         return self._contract.address
 
     def get_candidates(self) -> Optional[List[str]]:
+        if self._candidates is not None:
+            return list(self._candidates)
         res = self._contract.get_candidates()
         if not res:
             return
-        return [c.decode() for c in res]
+        self._candidates = tuple(c.decode() for c in res)
+        return list(self._candidates)
 
     def has_voted(self, voter_id: int) -> Optional[bool]:
-        return self._contract.has_voted(voter_id)
+        if self._indexer:
+            res = self._indexer.has_voted(self.address, voter_id)
+        else:
+            res = self._contract.has_voted(voter_id)
+        if res is None:
+            self._stale()
+        return res
 
     def vote_and_get_results(self, voter_id: int, candidate_index: int) -> Optional[List[Tuple[str, int]]]:
-        if not self._contract.vote(voter_id, candidate_index):
+        try:
+            block = VoteAggregator.submit_single(self._contract, voter_id, candidate_index).result(RECEIPT_TIMEOUT)
+        except FutureTimeoutError:
+            logger.warning(f'vote of {voter_id} at {self.address} is not mined after {RECEIPT_TIMEOUT} seconds')
+            return
+        if block is None:
             return
+        self._vote_counted(candidate_index, block)
+        return self._get_results_after_vote()
+
+    def submit_vote(self, voter_id: int, candidate_index: int) -> Future:
+        """Submits the vote without waiting; the future gets the block it was counted in, or None"""
+        if self._aggregator:
+            accepted = self._aggregator.submit(self._contract, voter_id, candidate_index)
+        else:
+            accepted = VoteAggregator.submit_single(self._contract, voter_id, candidate_index)
+
+        def vote_mined(mined: Future):
+            if mined.result() is not None:
+                self._vote_counted(candidate_index, mined.result())
+
+        accepted.add_done_callback(vote_mined)
+        return accepted
+
+    def vote_async(self, voter_id: int, candidate_index: int, on_done: ResultsCallback) -> bool:
+        """Submits the vote and returns immediately; on_done gets the results (or None) once the vote is mined"""
+
+        def vote_mined(mined: Future):
+            if mined.result() is None:
+                logger.warning(f'vote of {voter_id} at {self.address} failed')
+                on_done(None)
+                return
+            try:
+                results = self._get_results_after_vote()
+            except Exception as e:
+                logger.error(f'reading results of {self.address} after the vote of {voter_id} failed: {e}')
+                results = None
+            on_done(results)
+
+        self.submit_vote(voter_id, candidate_index).add_done_callback(vote_mined)
+        return True
+
+    def _vote_counted(self, candidate_index: int, block: int) -> None:
+        if self._results_cache:
+            self._results_cache.record_vote(self.address, candidate_index, block)
+
+    def _get_results_after_vote(self) -> Optional[List[Tuple[str, int]]]:
+        if self._indexer:
+            # the vote is mined at this point, pull its log in right away instead of waiting for the poller
+            try:
+                self._indexer.sync()
+            except Exception as e:
+                # the indexed tallies are still served, the poller catches up with the vote later
+                logger.warning(f'syncing the index after a vote at {self.address} failed: {e}')
         return self.get_candidates_votes()
 
     def get_candidates_votes(self) -> Optional[List[Tuple[str, int]]]:
-        res = self._contract.get_candidates_and_votes()
+        if self._indexer:
+            return self._get_indexed_candidates_votes()
+        if self._results_cache:
+            res = self._results_cache.get(self.address, self._read_results)
+        else:
+            res = self._read_results('latest')
         if not res:
+            self._stale()
+            return
+        return list(res)
+
+    def _read_results(self, block) -> Optional[Results]:
+        res = self._contract.get_candidates_and_votes(block)
+        if not res:
+            return
+        return tuple((c.decode(), v) for c, v in res)
+
+    def _get_indexed_candidates_votes(self) -> Optional[List[Tuple[str, int]]]:
+        tallies = self._indexer.get_tallies(self.address)
+        candidates = self.get_candidates()
+        if tallies is None or not candidates:
+            self._stale()
             return
-        return [(c.decode(), v) for c, v in res]
+        return [(c, tallies.get(i, 0)) for i, c in enumerate(candidates)]
 
     def finalize(self, callie_id: int) -> Optional[List[Tuple[str, int]]]:
-        return self._finalizer(self._contract, callie_id)
+        done = Future()
+        if not self._finalizer(self._contract, callie_id, done.set_result):
+            return
+        try:
+            return done.result(RECEIPT_TIMEOUT)
+        except FutureTimeoutError:
+            logger.warning(f'finalization of {self.address} did not finish in {RECEIPT_TIMEOUT} seconds')
+
+    def finalize_async(self, callie_id: int, on_done: ResultsCallback) -> bool:
+        """Returns False right away if the voting can't be finalized by callie, otherwise on_done gets the results
+        once the contract is killed"""
+        return self._finalizer(self._contract, callie_id, on_done)
+
+class ArchivedVoting:
+    """A finalized voting served from the archive: its results can be read, but it can't be voted in anymore"""
+    finalized = True
+
+    def __init__(self, address: str, results: List[Tuple[str, int]]):
+        self.__address = address
+        self.__results = tuple(results)
+
+    @property
+    def address(self) -> str:
+        return self.__address
+
+    def get_candidates(self) -> List[str]:
+        return [candidate for candidate, _ in self.__results]
+
+    def has_voted(self, voter_id: int) -> Optional[bool]:
+        # voters aren't archived
+        return
+
+    def vote_and_get_results(self, voter_id: int, candidate_index: int) -> Optional[List[Tuple[str, int]]]:
+        return
+
+    def submit_vote(self, voter_id: int, candidate_index: int) -> Future:
+        rejected = Future()
+        rejected.set_result(None)
+        return rejected
+
+    def vote_async(self, voter_id: int, candidate_index: int, on_done: ResultsCallback) -> bool:
+        return False
+
+    def get_candidates_votes(self) -> List[Tuple[str, int]]:
+        return list(self.__results)
+
+    def finalize(self, callie_id: int) -> Optional[List[Tuple[str, int]]]:
+        return
+
+    def finalize_async(self, callie_id: int, on_done: ResultsCallback) -> bool:
+        return False
+
 
 class VotingManager:
 
-    def __init__(self, ip_address: Tuple[int, int, int, int], port: int):
-        self._contract_factory = VotingContractFactory(ip_address, port)
+    def __init__(self, endpoints: Sequence[Union[str, BaseProvider]], cache_capacity: int = 1024,
+                 index_checkpoint_path: Optional[str] = None, index_poll_interval: float = 1.0,
+                 admin_accounts: Optional[List[str]] = None, vote_batch_size: int = 50,
+                 vote_batch_delay: float = 1.0, clone_factory_address: Optional[str] = None,
+                 read_strategy: str = 'round_robin', results_block_poll_interval: float = 1.0,
+                 archive_path: Optional[str] = None, local_nonces: bool = True):
+        self._contract_factory = VotingContractFactory(endpoints, admin_accounts, clone_factory_address, read_strategy,
+                                                       local_nonces)
+        self._cache = VotingCache(cache_capacity)
+        # contracts without events are read from the chain, at most once per block however many users look
+        self._results_cache = ResultsCache(lambda: self._contract_factory.w3.eth.blockNumber,
+                                           results_block_poll_interval, cache_capacity)
+        self._aggregator = VoteAggregator(vote_batch_size, vote_batch_delay)
+        self._indexer = VotingIndexer(self._contract_factory.w3, VotingContractFactory.event_abi('Voted'),
+                                      VotingContractFactory.event_abi('Finalized'), index_checkpoint_path,
+                                      index_poll_interval)
+        self._indexer.start()
+        # results of finalized votings, their contracts are gone
+        self._archive = VotingArchive(archive_path) if archive_path else None
+
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+    @property
+    def results_cache_stats(self) -> Dict[str, int]:
+        return self._results_cache.stats()
+
+    def _forget(self, address: str) -> None:
+        self._cache.invalidate(address)
+        self._results_cache.invalidate(address)
+
+    def _make_voting(self, entry: CachedVoting) -> Voting:
+        indexer = self._indexer if entry.contract.emits_events else None
+        return Voting(entry.contract, self._finalize_voting, entry.candidates, self._forget, indexer,
+                      self._aggregator, self._results_cache)
 
     def _try_get_contract_by_address(self, address: str) -> Optional[VotingContract]:
         return self._contract_factory.restore_from_address(address)
@@ -52,23 +254,69 @@ class VotingManager:
         contract = self._contract_factory.create(candidates, owner_id)
         return contract
 
-    def get_voting_from_address(self, address: str) -> Optional[Voting]:
+    def get_voting_from_address(self, address: str) -> Optional[Union[Voting, ArchivedVoting]]:
+        if self._archive:
+            # checked first, another process may have finalized a voting that's still in our cache
+            results = self._archive.get(address)
+            if results is not None:
+                self._forget(address)
+                return ArchivedVoting(address, results)
+        entry = self._cache.get(address)
+        if entry:
+            return self._make_voting(entry)
         contract = self._try_get_contract_by_address(address)
-        if contract:
+        if not contract:
+            return
+        candidates = contract.get_candidates()
+        if not candidates:
             return Voting(contract, self._finalize_voting)
+        entry = CachedVoting(contract, tuple(c.decode() for c in candidates))
+        if contract.emits_events:
+            self._indexer.track(contract.address)
+        self._cache.put(entry)
+        return self._make_voting(entry)
 
     def create_new_voting(self, candidates: List[str], owner_id) -> Optional[Voting]:
-        candidates_bytes = b'\x00'.join((candidate.encode() for candidate in candidates))
+        if any(len(candidate.encode()) > CANDIDATE_NAME_BYTES for candidate in candidates):
+            logger.warning(f'candidate names of {owner_id} do not fit into {CANDIDATE_NAME_BYTES} bytes')
+            return
+        if self._contract_factory.uses_clones:
+            candidates_bytes = pack_candidates(candidates)
+        else:
+            candidates_bytes = b'\x00'.join((candidate.encode() for candidate in candidates))
         contract = self._create_new_contract(candidates_bytes, owner_id)
         if not contract:
             return
-        return Voting(contract, self._finalize_voting)
+        entry = CachedVoting(contract, tuple(candidates))
+        if contract.emits_events:
+            self._indexer.track(contract.address, backfill=False)
+        self._cache.put(entry)
+        return self._make_voting(entry)
 
-    def _finalize_voting(self, contract: Optional[VotingContract], callie_id: int) -> Optional[List[Tuple[str, int]]]:
-        if contract:
-            results: List[Tuple[bytes, int]] = contract.get_candidates_and_votes()
-            if not results:
-                return
-            if not contract.kill(callie_id):
+    def _finalize_voting(self, contract: Optional[VotingContract], callie_id: int, on_done: ResultsCallback) -> bool:
+        if not contract:
+            return False
+        results: List[Tuple[bytes, int]] = contract.get_candidates_and_votes()
+        if not results:
+            self._forget(contract.address)
+            return False
+        pending = contract.submit_kill(callie_id)
+        if not pending:
+            return False
+
+        def kill_mined(mined: PendingTransaction):
+            if not mined.succeeded():
+                logger.warning(f'kill of {contract.address} failed')
+                on_done(None)
                 return
-            return [(c.decode(), v) for c, v in results]
+            decoded = [(c.decode(), v) for c, v in results]
+            if self._archive:
+                try:
+                    self._archive.add(contract.address, decoded)
+                except Exception as e:
+                    logger.error(f'archiving results of {contract.address} failed: {e}')
+            self._forget(contract.address)
+            on_done(decoded)
+
+        pending.add_done_callback(kill_mined)
+        return True
@@ -0,0 +1,189 @@
+"""Backend benchmarks against an in-process eth-tester chain, no node or network needed.
+
+Run from the repository root, results go to a JSON file that can be diffed between runs:
+
+    python -m benchmarks.backend_benchmark --candidates 1 5 10 --voters 1 100 10000 --output bench.json
+"""
+import argparse
+import json
+import math
+import platform
+import threading
+import time
+from collections import Counter
+from concurrent.futures import wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from web3 import Web3
+from web3.providers import BaseProvider
+from web3.providers.eth_tester import EthereumTesterProvider
+
+from backend.VotingManager import VotingManager, Voting
+
+OWNER_ID = 1
+SEED_WINDOW = 500
+# voters of the measured votes, far above the seeded ones
+FIRST_MEASURED_VOTER = 10 ** 9
+
+
+class CountingProvider(BaseProvider):
+    """Passes requests to another provider, counting them per method and remembering the hashes of sent transactions"""
+
+    def __init__(self, provider: BaseProvider):
+        self.__request = provider.request_func(Web3(provider), [])
+        self.__lock = threading.Lock()
+        self.__calls = Counter()
+        self.__transactions: List[str] = []
+
+    def make_request(self, method, params):
+        # eth-tester isn't thread-safe, and the manager's background threads send requests too
+        with self.__lock:
+            response = self.__request(method, params)
+            self.__calls[method] += 1
+            if method in ('eth_sendTransaction', 'eth_sendRawTransaction') and 'result' in response:
+                self.__transactions.append(response['result'])
+        return response
+
+    def snapshot(self) -> Tuple[Counter, int]:
+        with self.__lock:
+            return Counter(self.__calls), len(self.__transactions)
+
+    def transactions_since(self, position: int) -> List[str]:
+        with self.__lock:
+            return self.__transactions[position:]
+
+    def isConnected(self):
+        return True
+
+
+class Benchmark:
+    def __init__(self, samples: int):
+        self.__samples = samples
+        tester = EthereumTesterProvider()
+        # receipts for gas accounting are fetched around the counter, so they don't show up in the call counts
+        self.__w3 = Web3(tester)
+        self.__provider = CountingProvider(tester)
+        self.manager = VotingManager([self.__provider])
+        # its poller would add requests of its own to whatever is measured, the index is synced after seeding instead;
+        # the remaining background threads (receipts, vote batches) only work for the measured operations
+        self.manager._indexer.stop()
+        self.results: List[dict] = []
+        self.__next_voter = FIRST_MEASURED_VOTER
+
+    def new_voter(self) -> int:
+        self.__next_voter += 1
+        return self.__next_voter
+
+    def _gas_used(self, transactions: List[str]) -> int:
+        return sum(self.__w3.eth.getTransactionReceipt(transaction)['gasUsed'] for transaction in transactions)
+
+    def measure(self, operation: str, candidates: int, voters: int, run: Callable[[int], None],
+                prepare: Optional[Callable[[int], None]] = None) -> None:
+        """Runs run(sample) samples times and records latency percentiles, RPC calls and gas per call"""
+        latencies = []
+        calls = Counter()
+        gas = 0
+        for sample in range(self.__samples):
+            if prepare:
+                prepare(sample)
+            calls_before, transactions_before = self.__provider.snapshot()
+            started = time.perf_counter()
+            run(sample)
+            latencies.append(time.perf_counter() - started)
+            calls_after, _ = self.__provider.snapshot()
+            calls.update(calls_after - calls_before)
+            gas += self._gas_used(self.__provider.transactions_since(transactions_before))
+        self.results.append({
+            'operation': operation,
+            'candidates': candidates,
+            'voters': voters,
+            'samples': self.__samples,
+            'latency_ms': summarize(latencies),
+            'rpc_calls': round(sum(calls.values()) / self.__samples, 2),
+            'rpc_calls_by_method': {method: round(count / self.__samples, 2)
+                                    for method, count in sorted(calls.items())},
+            'gas': gas // self.__samples,
+        })
+        print(f'{operation:40} candidates={candidates:<3} voters={voters:<6} '
+              f'p50={self.results[-1]["latency_ms"]["p50"]:9.2f}ms rpc={self.results[-1]["rpc_calls"]:7.2f} '
+              f'gas={self.results[-1]["gas"]}')
+
+    def seed_votes(self, voting: Voting, voters: range, candidates: int) -> None:
+        """Casts one vote per voter, SEED_WINDOW transactions in flight at a time"""
+        contract = voting._contract
+        voters = list(voters)
+        for start in range(0, len(voters), SEED_WINDOW):
+            pending = [contract.submit_vote(voter_id, voter_id % candidates)
+                       for voter_id in voters[start:start + SEED_WINDOW]]
+            wait([transaction for transaction in pending if transaction])
+        self.manager._indexer.sync()
+
+    def run(self, candidate_counts: List[int], voter_counts: List[int]) -> None:
+        for candidates in candidate_counts:
+            names = [f'candidate {index}' for index in range(candidates)]
+            created: List[Voting] = []
+            self.measure('create_new_voting', candidates, 0,
+                         lambda sample: created.append(self.manager.create_new_voting(names, OWNER_ID)))
+            target = self.manager.create_new_voting(names, OWNER_ID)
+            seeded = 0
+            for voters in sorted(voter_counts):
+                self.seed_votes(target, range(seeded, voters), candidates)
+                seeded = voters
+                address = target.address
+                cache = self.manager._cache
+                self.measure('get_voting_from_address', candidates, voters,
+                             lambda sample: self.manager.get_voting_from_address(address),
+                             prepare=lambda sample: cache.invalidate(address))
+                self.measure('get_voting_from_address (cached)', candidates, voters,
+                             lambda sample: self.manager.get_voting_from_address(address))
+                voting = self.manager.get_voting_from_address(address)
+                self.measure('get_candidates', candidates, voters, lambda sample: voting.get_candidates())
+                self.measure('VotingContract.get_candidates', candidates, voters,
+                             lambda sample: voting._contract.get_candidates())
+                self.measure('vote_and_get_results', candidates, voters,
+                             lambda sample: voting.vote_and_get_results(self.new_voter(), sample % candidates))
+                self.measure('get_candidates_votes', candidates, voters, lambda sample: voting.get_candidates_votes())
+                # what a cache miss costs
+                self.measure('VotingContract.get_candidates_and_votes', candidates, voters,
+                             lambda sample: voting._contract.get_candidates_and_votes())
+            # the votings made by create_new_voting have no votes
+            self.measure('finalize', candidates, 0, lambda sample: created[sample].finalize(OWNER_ID))
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latency * 1000 for latency in latencies)
+
+    def percentile(p: float) -> float:
+        # nearest rank
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {'p50': round(percentile(50), 3), 'p90': round(percentile(90), 3), 'p99': round(percentile(99), 3),
+            'mean': round(sum(ordered) / len(ordered), 3), 'min': round(ordered[0], 3), 'max': round(ordered[-1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks VotingManager operations on a local eth-tester chain')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[1, 5, 10])
+    parser.add_argument('--voters', type=int, nargs='+', default=[1, 100, 1000, 10000])
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--output', default='benchmark-results.json')
+    args = parser.parse_args()
+    if any(not 1 <= count <= 10 for count in args.candidates):
+        parser.error('a voting has 1 to 10 candidates')
+    benchmark = Benchmark(args.samples)
+    started = time.time()
+    benchmark.run(args.candidates, args.voters)
+    with open(args.output, 'w') as output:
+        json.dump({
+            'started': started,
+            'duration': round(time.time() - started, 1),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'arguments': vars(args),
+            'results': benchmark.results,
+        }, output, indent=2)
+    print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""Load test of the whole bot: simulated users talk to the real conversation handler through a fake Telegram bot,
+on top of an in-process eth-tester chain. Updates go through the updater's bounded queue and the ordered per-user
+dispatcher, as they do in production.
+
+Every voting gets an owner who creates it and later finalizes it, and voters who select it, vote, view the results
+and cancel. Run from the repository root:
+
+    python -m benchmarks.bot_load --votings 20 --voters-per-voting 100 --concurrency 32 --output bot-load.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telegram import Update, Message, User, Chat
+from telegram.ext import TypeHandler
+from web3.providers.eth_tester import EthereumTesterProvider
+
+from backend.Metrics import METRICS
+from backend.SessionStore import SessionStore, InMemorySessionStore
+from backend.VotingManager import VotingManager
+from benchmarks.backend_benchmark import CountingProvider, summarize
+from main import build_updater, BUILDER_CANDIDATES, SELECTED_VOTING, MAIN_MENU, VOTING_CREATION, \
+    VOTING_SELECTION, VOTING_MANAGEMENT
+
+STATE_NAMES = {None: 'start', MAIN_MENU: 'main_menu', VOTING_CREATION: 'voting_creation',
+               VOTING_SELECTION: 'voting_selection', VOTING_MANAGEMENT: 'voting_management'}
+SESSION_NAMESPACES = ('conversation', BUILDER_CANDIDATES, SELECTED_VOTING)
+# owners get ids from here on, voters from FIRST_VOTER
+FIRST_OWNER = 1
+FIRST_VOTER = 10 ** 6
+
+
+class FakeRequest:
+    # the updater checks the bot's connection pool is big enough for its workers
+    con_pool_size = 10 ** 6
+
+
+class FakeBot:
+    """Stands in for telegram.Bot, keeping what the bot sends in memory instead"""
+
+    username = 'voting_load_bot'
+    request = FakeRequest()
+
+    def __init__(self):
+        self.__messages: Dict[int, List[Tuple[float, str]]] = defaultdict(list)
+        self.__changed = threading.Condition()
+        self.errors = 0
+
+    def send_message(self, chat_id, text, **kwargs):
+        with self.__changed:
+            self.__messages[chat_id].append((time.perf_counter(), text))
+            # replies from the error helpers, including the ones sent once a transaction turns out to have failed
+            self.errors += text.startswith('Something went wrong')
+            self.__changed.notify_all()
+
+    def last_message(self, chat_id: int) -> str:
+        with self.__changed:
+            return self.__messages[chat_id][-1][1]
+
+    def wait_for(self, chat_id: int, matches: Callable[[str], bool], after: float, timeout: float) -> Optional[float]:
+        """Waits for a matching message to the chat sent after the given time, returns the time it was sent"""
+
+        def sent() -> Optional[float]:
+            return next((at for at, text in self.__messages[chat_id] if at >= after and matches(text)), None)
+
+        with self.__changed:
+            self.__changed.wait_for(lambda: sent() is not None, timeout)
+            return sent()
+
+
+def session_footprint(sessions: SessionStore) -> Dict[str, Dict[str, int]]:
+    """Entries and bytes of keys and values kept per namespace, as the in-memory store holds them (JSON strings)"""
+    footprint = {}
+    for namespace in SESSION_NAMESPACES:
+        entries = size = 0
+        for key in list(sessions.keys(namespace)):
+            value = sessions.get(namespace, key)
+            if value is None:
+                continue
+            entries += 1
+            size += sys.getsizeof(json.dumps(key, separators=(',', ':'))) + \
+                sys.getsizeof(json.dumps(value, separators=(',', ':')))
+        footprint[namespace] = {'entries': entries, 'bytes': size}
+    return footprint
+
+
+class LoadTest:
+    def __init__(self, votings: int, voters_per_voting: int, candidates: int, concurrency: int, timeout: float):
+        self.__votings = votings
+        self.__voters_per_voting = voters_per_voting
+        self.__candidates = [f'candidate {index}' for index in range(candidates)]
+        self.__concurrency = concurrency
+        self.__timeout = timeout
+        self.provider = CountingProvider(EthereumTesterProvider())
+        self.manager = VotingManager([self.provider])
+        self.sessions = InMemorySessionStore()
+        self.bot = FakeBot()
+        self.__updater = build_updater(self.bot, self.manager, self.sessions, workers=concurrency)
+        self.__dispatcher = self.__updater.dispatcher
+        self.__conversations = self.__dispatcher.handlers[0][0].conversations
+        # a later group sees every update once the conversation handler is done with it
+        self.__dispatcher.add_handler(TypeHandler(Update, self._processed), group=1)
+        self.__processed: Dict[int, threading.Event] = {}
+        self.__update_ids = itertools.count(1)
+        self.__lock = threading.Lock()
+        self.timeouts = 0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.commands = 0
+        self.phases: List[dict] = []
+
+    def _processed(self, bot, update: Update) -> None:
+        with self.__lock:
+            processed = self.__processed.pop(update.update_id, None)
+        if processed:
+            processed.set()
+
+    def send(self, user_id: int, text: str) -> None:
+        """Puts an update on the updater's bounded queue, the way polling does, and times it until it's handled"""
+        update_id = next(self.__update_ids)
+        user = User(user_id, f'user {user_id}', False, username=f'user{user_id}')
+        message = Message(update_id, user, datetime.now(), Chat(user_id, 'private'), text=text, bot=self.bot)
+        state = STATE_NAMES[self.__conversations.get((user_id, user_id))]
+        processed = threading.Event()
+        with self.__lock:
+            self.__processed[update_id] = processed
+        started = time.perf_counter()
+        # blocks while the queue is full, which is part of the latency users would see
+        self.__updater.update_queue.put(Update(update_id, message=message))
+        handled = processed.wait(self.__timeout)
+        elapsed = time.perf_counter() - started
+        with self.__lock:
+            self.latencies[state].append(elapsed)
+            self.commands += 1
+            if not handled:
+                self.__processed.pop(update_id, None)
+                self.timeouts += 1
+
+    def _phase(self, name: str, tasks: List[Callable[[], None]]) -> None:
+        commands = self.commands
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.__concurrency, thread_name_prefix=name) as executor:
+            for future in [executor.submit(task) for task in tasks]:
+                future.result()
+        duration = time.perf_counter() - started
+        self.phases.append({
+            'phase': name,
+            'commands': self.commands - commands,
+            'duration': round(duration, 3),
+            'commands_per_second': round((self.commands - commands) / duration, 1),
+            'sessions': session_footprint(self.sessions),
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        })
+        print(f'{name:9} {self.phases[-1]["commands"]:7} commands {duration:8.2f}s '
+              f'{self.phases[-1]["commands_per_second"]:8.1f}/s')
+
+    def _create(self, owner_id: int, addresses: Dict[int, str]) -> None:
+        for text in ['/start', 'create'] + self.__candidates + ['/end']:
+            self.send(owner_id, text)
+        address = self.bot.last_message(owner_id)
+        if address.startswith('0x'):
+            addresses[owner_id] = address
+
+    def _vote(self, voter_id: int, address: str, submitted: Dict[int, float]) -> None:
+        # results are viewed before voting, so the only results sent after the vote are the mined ones
+        for text in ('/start', 'select', address, '/view'):
+            self.send(voter_id, text)
+        submitted[voter_id] = time.perf_counter()
+        self.send(voter_id, random.choice(self.__candidates))
+        self.send(voter_id, '/cancel')
+
+    def _finalize(self, owner_id: int, address: str, submitted: Dict[int, float]) -> None:
+        for text in ('select', address):
+            self.send(owner_id, text)
+        submitted[owner_id] = time.perf_counter()
+        self.send(owner_id, '/finalize')
+
+    def _confirmations(self, submitted: Dict[int, float], matches: Callable[[str], bool]) -> Dict[str, object]:
+        """Latency from submission to the message telling how the transaction went"""
+        latencies = []
+        deadline = time.monotonic() + self.__timeout
+        for user_id, at in submitted.items():
+            sent = self.bot.wait_for(user_id, matches, at, max(0.0, deadline - time.monotonic()))
+            if sent is not None:
+                latencies.append(sent - at)
+        return {'confirmed': len(latencies), 'missing': len(submitted) - len(latencies),
+                'latency_ms': summarize(latencies) if latencies else None}
+
+    def run(self) -> dict:
+        # the dispatcher thread hands updates from the queue to the OrderedDispatcher's per-user executor
+        dispatcher_thread = threading.Thread(target=self.__dispatcher.start, name='dispatcher', daemon=True)
+        dispatcher_thread.start()
+        try:
+            return self._run()
+        finally:
+            self.__dispatcher.stop()
+            dispatcher_thread.join()
+
+    def _run(self) -> dict:
+        baseline = session_footprint(self.sessions)
+        started = time.perf_counter()
+        owners = range(FIRST_OWNER, FIRST_OWNER + self.__votings)
+        addresses: Dict[int, str] = {}
+        self._phase('create', [lambda owner_id=owner_id: self._create(owner_id, addresses) for owner_id in owners])
+
+        submitted: Dict[int, float] = {}
+        voters = {}
+        for index, (owner_id, address) in enumerate(sorted(addresses.items())):
+            first = FIRST_VOTER + index * self.__voters_per_voting
+            for voter_id in range(first, first + self.__voters_per_voting):
+                voters[voter_id] = address
+        self._phase('vote', [lambda voter_id=voter_id, address=address: self._vote(voter_id, address, submitted)
+                             for voter_id, address in voters.items()])
+        votes = self._confirmations(submitted, lambda text: text.startswith('0x') or 'vote was not accepted' in text)
+
+        finalizing: Dict[int, float] = {}
+        self._phase('finalize', [lambda owner_id=owner_id, address=address:
+                                 self._finalize(owner_id, address, finalizing)
+                                 for owner_id, address in addresses.items()])
+        finalizations = self._confirmations(finalizing, lambda text: 'finalized' in text or 'finalization of' in text)
+        duration = time.perf_counter() - started
+
+        calls, _ = self.provider.snapshot()
+        users = len(addresses) + len(voters)
+        end = self.phases[-1]['sessions']
+        growth = {namespace: {'entries': end[namespace]['entries'] - baseline[namespace]['entries'],
+                              'bytes': end[namespace]['bytes'] - baseline[namespace]['bytes']}
+                  for namespace in SESSION_NAMESPACES}
+        return {
+            'users': users,
+            'votings_created': len(addresses),
+            'commands': self.commands,
+            'errors': self.bot.errors,
+            'timeouts': self.timeouts,
+            'duration': round(duration, 3),
+            'commands_per_second': round(self.commands / duration, 1),
+            'rpc_calls_per_command': round(sum(calls.values()) / max(1, self.commands), 2),
+            'latency_ms': {state: summarize(latencies) for state, latencies in sorted(self.latencies.items())},
+            'vote_confirmation': votes,
+            'finalization_confirmation': finalizations,
+            'phases': self.phases,
+            # what stays in the session store once every user is back in the main menu
+            'session_growth': {namespace: dict(change, bytes_per_user=round(change['bytes'] / max(1, users), 1))
+                               for namespace, change in growth.items()},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drives the bot with simulated users on a local eth-tester chain')
+    parser.add_argument('--votings', type=int, default=20)
+    parser.add_argument('--voters-per-voting', type=int, default=100)
+    parser.add_argument('--candidates', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=32, help='users talking to the bot at the same time')
+    parser.add_argument('--timeout', type=float, default=300, help='how long to wait for votes and kills to be mined')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bot-load-results.json')
+    args = parser.parse_args()
+    if not 1 <= args.candidates <= 10:
+        parser.error('a voting has 1 to 10 candidates')
+    # the handlers log every user action, and on eth-tester every chain call would be logged as slow
+    logging.getLogger().setLevel(logging.WARNING)
+    METRICS.slow_threshold = None
+    random.seed(args.seed)
+    load_test = LoadTest(args.votings, args.voters_per_voting, args.candidates, args.concurrency, args.timeout)
+    started = time.time()
+    results = load_test.run()
+    with open(args.output, 'w') as output:
+        json.dump({
+            'started': started,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'arguments': vars(args),
+            'results': results,
+        }, output, indent=2)
+    print(f'{results["commands"]} commands from {results["users"]} users, {results["commands_per_second"]}/s, '
+          f'{results["errors"]} errors, {results["timeouts"]} timeouts')
+    for state, latency in results['latency_ms'].items():
+        print(f'{state:18} p50={latency["p50"]:9.2f}ms p90={latency["p90"]:9.2f}ms p99={latency["p99"]:9.2f}ms')
+    print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""Creates votings in bulk and optionally casts pre-recorded votes in them.
+
+Votings come from CSV rows `key,owner_id,candidate,candidate,...` or JSONL objects
+{"key": ..., "owner_id": ..., "candidates": [...]}; votes from CSV rows `key,voter_id,candidate` or JSONL
+objects {"key": ..., "voter_id": ..., "candidate": ...}, where candidate is a name or an index. Keys are any
+unique names linking votes to their voting. Progress goes to a checkpoint file, so running the same command
+again after an interruption picks up where it stopped. The resulting key -> address manifest is written
+as CSV at the end:
+
+    python bulk_import.py votings.csv --votes ballots.jsonl --manifest addresses.csv
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from backend.VotingManager import VotingManager, Voting, CANDIDATE_NAME_BYTES
+
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_CANDIDATES = 10
+
+
+class VotingDefinition(NamedTuple):
+    key: str
+    owner_id: int
+    candidates: List[str]
+
+
+class Ballot(NamedTuple):
+    line: int
+    key: str
+    voter_id: int
+    candidate: str
+
+
+def _read_records(path: str, on_malformed: Callable[[], None]) -> Iterator[Tuple[int, list]]:
+    """Yields (line number, record) pairs, records are dicts for JSONL and lists for CSV"""
+    with open(path, newline='', encoding='utf-8') as source:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line, text in enumerate(source, 1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                    if not isinstance(record, dict):
+                        raise ValueError('not a JSON object')
+                except ValueError as e:
+                    _malformed(path, line, e, on_malformed)
+                    continue
+                yield line, record
+        else:
+            for line, row in enumerate(csv.reader(source), 1):
+                # a header row is optional
+                if row and not (line == 1 and row[0] == 'key'):
+                    yield line, row
+
+
+def _malformed(path: str, line: int, error: Exception, on_malformed: Callable[[], None]) -> None:
+    # one bad record must not stop the import, the rest of the file is still worth importing
+    logger.error(f'{path} line {line}: malformed record skipped ({type(error).__name__}: {error})')
+    on_malformed()
+
+
+def read_definitions(path: str, on_malformed: Callable[[], None]) -> Iterator[VotingDefinition]:
+    for line, record in _read_records(path, on_malformed):
+        try:
+            if isinstance(record, dict):
+                definition = VotingDefinition(str(record['key']), int(record['owner_id']),
+                                              [str(c) for c in record['candidates']])
+            else:
+                definition = VotingDefinition(record[0], int(record[1]), [c for c in record[2:] if c])
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            _malformed(path, line, e, on_malformed)
+            continue
+        yield definition
+
+
+def read_ballots(path: str, on_malformed: Callable[[], None]) -> Iterator[Ballot]:
+    for line, record in _read_records(path, on_malformed):
+        try:
+            if isinstance(record, dict):
+                ballot = Ballot(line, str(record['key']), int(record['voter_id']), str(record['candidate']))
+            else:
+                ballot = Ballot(line, record[0], int(record[1]), record[2])
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            _malformed(path, line, e, on_malformed)
+            continue
+        yield ballot
+
+
+def validate(definition: VotingDefinition) -> Optional[str]:
+    """Applies the rules the chat flow enforces; returns what's wrong, if anything"""
+    if not 1 <= len(definition.candidates) <= MAX_CANDIDATES:
+        return f'a voting needs 1 to {MAX_CANDIDATES} candidates'
+    if len(set(definition.candidates)) != len(definition.candidates):
+        return 'duplicate candidates are not allowed'
+    if any(len(candidate.encode()) > CANDIDATE_NAME_BYTES for candidate in definition.candidates):
+        return f'candidate names are limited to {CANDIDATE_NAME_BYTES} bytes'
+
+
+class Checkpoint:
+    """Append-only JSONL log of finished work; replaying it on start restores the progress"""
+
+    def __init__(self, path: str):
+        self.__path = path
+        self.votings: Dict[str, dict] = {}
+        self.votes_through = 0
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as log:
+                for text in log:
+                    if not text.strip():
+                        continue
+                    try:
+                        record = json.loads(text)
+                    except ValueError:
+                        # the last line may be cut short by the interruption
+                        continue
+                    if 'address' in record:
+                        self.votings[record['key']] = record
+                    if 'votes_through' in record:
+                        self.votes_through = max(self.votes_through, record['votes_through'])
+        self.__log = open(path, 'a', encoding='utf-8')
+        self.__lock = threading.Lock()
+
+    def _append(self, record: dict) -> None:
+        with self.__lock:
+            self.__log.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.__log.flush()
+            os.fsync(self.__log.fileno())
+
+    def voting_created(self, definition: VotingDefinition, address: str) -> None:
+        record = {'key': definition.key, 'address': address, 'owner_id': definition.owner_id,
+                  'candidates': definition.candidates}
+        self.votings[definition.key] = record
+        self._append(record)
+
+    def votes_done_through(self, line: int) -> None:
+        self.votes_through = line
+        self._append({'votes_through': line})
+
+    def close(self) -> None:
+        self.__log.close()
+
+
+class Importer:
+    def __init__(self, manager: VotingManager, checkpoint: Checkpoint, deploy_concurrency: int,
+                 votes_in_flight: int):
+        self.__manager = manager
+        self.__checkpoint = checkpoint
+        self.__deploy_concurrency = deploy_concurrency
+        self.__votes_in_flight = votes_in_flight
+        self.__failures_lock = threading.Lock()
+        self.failures = 0
+
+    def _failed(self) -> None:
+        with self.__failures_lock:
+            self.failures += 1
+
+    def _create(self, definition: VotingDefinition) -> None:
+        voting = self.__manager.create_new_voting(definition.candidates, definition.owner_id)
+        if not voting:
+            logger.error(f'creating voting {definition.key} failed')
+            self._failed()
+            return
+        self.__checkpoint.voting_created(definition, voting.address)
+
+    def create_votings(self, definitions: Iterator[VotingDefinition]) -> None:
+        """Deploys the votings not in the checkpoint yet, deploy_concurrency of them in flight at a time"""
+        seen = set()
+        with ThreadPoolExecutor(self.__deploy_concurrency, thread_name_prefix='deploy') as executor:
+            in_flight = set()
+            for definition in definitions:
+                if definition.key in seen:
+                    logger.error(f'voting key {definition.key} is used more than once, skipping')
+                    self._failed()
+                    continue
+                seen.add(definition.key)
+                if definition.key in self.__checkpoint.votings:
+                    continue
+                problem = validate(definition)
+                if problem:
+                    logger.error(f'voting {definition.key}: {problem}')
+                    self._failed()
+                    continue
+                if len(in_flight) >= self.__deploy_concurrency:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(executor.submit(self._create, definition))
+            wait(in_flight)
+        logger.info(f'{len(self.__checkpoint.votings)} votings deployed')
+
+    def _resolve(self, ballot: Ballot, votings: Dict[str, Voting]) -> Optional[Tuple[Voting, int]]:
+        record = self.__checkpoint.votings.get(ballot.key)
+        if record is None:
+            logger.error(f'line {ballot.line}: no voting {ballot.key}')
+            return
+        candidates = record['candidates']
+        if ballot.candidate in candidates:
+            index = candidates.index(ballot.candidate)
+        elif ballot.candidate.isdigit() and int(ballot.candidate) < len(candidates):
+            index = int(ballot.candidate)
+        else:
+            logger.error(f'line {ballot.line}: {ballot.candidate} is not a candidate of {ballot.key}')
+            return
+        if ballot.key not in votings:
+            votings[ballot.key] = self.__manager.get_voting_from_address(record['address'])
+        voting = votings[ballot.key]
+        if not voting or voting.finalized:
+            logger.error(f'line {ballot.line}: voting {ballot.key} at {record["address"]} is gone')
+            return
+        return voting, index
+
+    def cast_votes(self, ballots: Iterator[Ballot], checkpoint_every: int = 500) -> None:
+        """Submits the votes past the checkpoint, at most votes_in_flight unconfirmed at a time.
+
+        Votes go through the manager's aggregator, so contracts with voteBatch get them in batches. Voters who
+        already voted are rejected by the contract, which makes replaying part of the file after a resume safe.
+        """
+        votings: Dict[str, Voting] = {}
+        # submitted votes in file order, the checkpoint only moves past votes that are all resolved
+        pending: Deque[Tuple[int, Future]] = deque()
+        rejected = 0
+        checkpointed = settled = self.__checkpoint.votes_through
+
+        def settle(block: bool) -> None:
+            nonlocal rejected, checkpointed, settled
+            while pending and (block or pending[0][1].done()):
+                line, future = pending.popleft()
+                if future.result() is None:
+                    rejected += 1
+                settled = line
+                block = False
+            if settled - checkpointed >= checkpoint_every:
+                self.__checkpoint.votes_done_through(settled)
+                checkpointed = settled
+
+        for ballot in ballots:
+            if ballot.line <= self.__checkpoint.votes_through:
+                continue
+            resolved = self._resolve(ballot, votings)
+            if resolved is None:
+                self._failed()
+                continue
+            voting, index = resolved
+            while len(pending) >= self.__votes_in_flight:
+                settle(block=True)
+            pending.append((ballot.line, voting.submit_vote(ballot.voter_id, index)))
+            settle(block=False)
+        while pending:
+            settle(block=True)
+        if settled > checkpointed:
+            self.__checkpoint.votes_done_through(settled)
+        if rejected:
+            logger.warning(f'{rejected} votes were not counted (voted already, or the transaction failed)')
+
+    def write_manifest(self, path: str) -> None:
+        with open(path, 'w', newline='', encoding='utf-8') as manifest:
+            writer = csv.writer(manifest)
+            writer.writerow(['key', 'address', 'owner_id', 'candidates'])
+            for key, record in self.__checkpoint.votings.items():
+                writer.writerow([key, record['address'], record['owner_id'], '|'.join(record['candidates'])])
+        logger.info(f'manifest of {len(self.__checkpoint.votings)} votings written to {path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Creates votings and casts votes in bulk')
+    parser.add_argument('votings', help='CSV or JSONL (.jsonl) file with voting definitions')
+    parser.add_argument('--votes', help='CSV or JSONL (.jsonl) file with votes to cast')
+    parser.add_argument('--manifest', default='manifest.csv', help='where to write the key -> address manifest')
+    parser.add_argument('--checkpoint', help='progress log, defaults to the manifest path + .checkpoint')
+    parser.add_argument('--node', action='append', help='ethereum node, the first one gets the transactions')
+    parser.add_argument('--admin', action='append', help='admin account to deploy from, can be repeated')
+    parser.add_argument('--clone-factory', help='address of a VotingFactory to create votings as clones')
+    parser.add_argument('--deploy-concurrency', type=int, default=8, help='votings deployed at the same time')
+    parser.add_argument('--votes-in-flight', type=int, default=1000, help='unconfirmed votes at a time')
+    parser.add_argument('--vote-batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    manager = VotingManager(args.node or ['http://127.0.0.1:14228'], admin_accounts=args.admin,
+                            vote_batch_size=args.vote_batch_size, clone_factory_address=args.clone_factory)
+    checkpoint = Checkpoint(args.checkpoint or args.manifest + '.checkpoint')
+    importer = Importer(manager, checkpoint, args.deploy_concurrency, args.votes_in_flight)
+    try:
+        importer.create_votings(read_definitions(args.votings, importer._failed))
+        if args.votes:
+            importer.cast_votes(read_ballots(args.votes, importer._failed))
+    finally:
+        checkpoint.close()
+    importer.write_manifest(args.manifest)
+    if importer.failures:
+        logger.error(f'{importer.failures} records failed, see the log above')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
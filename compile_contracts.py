@@ -0,0 +1,44 @@
+"""Compiles voting.sol and writes the ABI and bytecode of every contract in it to backend/VotingArtifacts.py.
+
+py-solc-x installs solc SOLC_VERSION on the first run, --solc uses an existing solc 0.4 binary instead:
+
+    pip install py-solc-x
+    python compile_contracts.py [--solc PATH]
+"""
+import argparse
+import json
+import os
+import re
+
+import solcx
+
+SOLC_VERSION = '0.4.24'
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATH = os.path.join(ROOT, 'voting.sol')
+ARTIFACTS_PATH = os.path.join(ROOT, 'backend', 'VotingArtifacts.py')
+
+
+def constant_prefix(contract_name: str) -> str:
+    # VotingFactory -> VOTING_FACTORY
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', contract_name).upper()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--solc', help='path to a solc 0.4 binary, by default py-solc-x installs ' + SOLC_VERSION)
+    args = parser.parse_args()
+    solc_binary = args.solc or solcx.install.get_executable(solcx.install_solc(SOLC_VERSION))
+    version = solcx.wrapper.get_solc_version(solc_binary, with_commit_hash=True)
+    compiled = solcx.compile_files([SOURCE_PATH], output_values=['abi', 'bin'], solc_binary=solc_binary)
+    with open(ARTIFACTS_PATH, 'w') as artifacts:
+        artifacts.write(f'"""ABIs and bytecode of voting.sol, generated by compile_contracts.py with solc {version};\n'
+                        f'do not edit by hand"""\n')
+        for key, output in sorted(compiled.items()):
+            prefix = constant_prefix(key.rsplit(':', 1)[1])
+            artifacts.write(f'\n{prefix}_ABI = {json.dumps(output["abi"], separators=(",", ":"))!r}\n')
+            artifacts.write(f'\n{prefix}_BYTECODE = {"0x" + output["bin"]!r}\n')
+    print(f'wrote {ARTIFACTS_PATH}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Deploys a VotingFactory and prints its address. Votings are created as cheap clones of its template once the
+address is passed to the bot as VOTING_BOT_CLONE_FACTORY or to bulk_import.py as --clone-factory:
+
+    python deploy_voting_factory.py --node http://127.0.0.1:14228
+"""
+import argparse
+import logging
+
+from backend.VotingContract import VotingContractFactory
+
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deploys a VotingFactory for creating votings as clones')
+    parser.add_argument('--node', default='http://127.0.0.1:14228', help='ethereum node holding the admin account')
+    parser.add_argument('--admin', help='account to deploy from, defaults to the node\'s first account')
+    args = parser.parse_args()
+    factory = VotingContractFactory([args.node], [args.admin] if args.admin else None)
+    address = factory.deploy_clone_factory()
+    if not address:
+        raise SystemExit('deployment failed, see the log above')
+    print(address)
+
+
+if __name__ == '__main__':
+    main()
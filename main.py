@@ -1,190 +1,150 @@
 import logging
+import os
+import threading
+from functools import partial, wraps
+from queue import Queue
+from urllib.parse import urlparse
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 
-from typing import Dict
+from typing import Optional, Union
 
 from telegram import Bot, Update, ReplyKeyboardMarkup
-from telegram.ext import Updater, CommandHandler, ConversationHandler, RegexHandler, Filters, MessageHandler
+from telegram.utils.request import Request
+from telegram.ext import Updater, Dispatcher, CommandHandler, ConversationHandler, RegexHandler, Filters, \
+    MessageHandler
 
 from backend.VotingBuilder import VotingBuilder, Voting
-from backend.VotingManager import VotingManager
+from backend.VotingManager import VotingManager, ArchivedVoting, CANDIDATE_NAME_BYTES
+from backend.SessionStore import SessionStore, InMemorySessionStore, SqliteSessionStore, SessionConversations
+from backend.KeyedExecutor import KeyedExecutor
+from backend.Metrics import METRICS
 
 logger = logging.getLogger(__name__)
-builders: Dict[int, VotingBuilder] = {}
-currently_modified_votings: Dict[int, Voting] = {}
-VOTING_MANAGER = VotingManager((127, 0, 0, 1), 14228)
+BOT_TOKEN = os.environ.get('VOTING_BOT_TOKEN', '')
+# point several processes at one database file to share users' sessions between them
+SESSION_DB = os.environ.get('VOTING_BOT_SESSION_DB')
+# "index/count": the process only serves users with user_id % count == index, update_router.py sends it their updates
+SHARD_INDEX, SHARD_COUNT = map(int, os.environ.get('VOTING_BOT_SHARD', '0/1').split('/'))
+BUILDER_CANDIDATES = 'candidates'
+SELECTED_VOTING = 'selected'
+# with a public url set (TLS terminated in front of us) updates come in over a local webhook instead of long polling;
+# sharded processes listen on the port plus their index, behind update_router.py
+WEBHOOK_URL = os.environ.get('VOTING_BOT_WEBHOOK_URL')
+WEBHOOK_PORT = int(os.environ.get('VOTING_BOT_WEBHOOK_PORT', '8443')) + SHARD_INDEX
+BOT_WORKERS = int(os.environ.get('VOTING_BOT_WORKERS', '16'))
+MAX_QUEUED_UPDATES = int(os.environ.get('VOTING_BOT_MAX_QUEUED_UPDATES', '1000'))
+# prometheus text format on http://127.0.0.1:<port>/metrics
+METRICS_PORT = int(os.environ.get('VOTING_BOT_METRICS_PORT', '9464'))
+METRICS.slow_threshold = float(os.environ.get('VOTING_BOT_SLOW_CALL_SECONDS', '1.0'))
+HANDLER_SECONDS = METRICS.histogram('voting_bot_handler_seconds', 'Duration of bot handlers', ('handler',))
+# the first node holds the admin accounts and gets all transactions, the others only serve reads
+ETHEREUM_NODES = ['http://127.0.0.1:14228']
+# results of finalized votings outlive their self-destructed contracts here
+ARCHIVE_PATH = os.environ.get('VOTING_BOT_ARCHIVE', 'finalized-votings.sqlite')
+# tallies of indexed votings survive restarts here, the journal next to it gets every sync's new logs;
+# each shard keeps its own
+INDEX_CHECKPOINT_PATH = os.environ.get('VOTING_BOT_INDEX_CHECKPOINT', 'voting-index.json')
+if SHARD_COUNT > 1:
+    INDEX_CHECKPOINT_PATH += f'.shard{SHARD_INDEX}'
+# address of a VotingFactory (see deploy_voting_factory.py), new votings are then created as its clones
+CLONE_FACTORY_ADDRESS = os.environ.get('VOTING_BOT_CLONE_FACTORY')
 CANDIDATE_NAME_LENGTH = 30
 MAIN_MENU, VOTING_CREATION, VOTING_SELECTION, VOTING_MANAGEMENT = range(4)
 MAIN_MENU_KEYBOARD = [['create'], ['select']]
 
 
-def send_hello(bot, update):
-    bot.send_message(chat_id=update.message.chat_id, text="Hi! This is a voting bot powered by ethereum blockchain!\n"
-                                                          "You can create or select existing voting by clicking on buttons bellow.\n"
-                                                          "To return to main menu from anywhere send /cancel command to the bot.",
-                     reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
-    return MAIN_MENU
+class OrderedDispatcher(Dispatcher):
+    """Runs handlers on a pool, one update at a time and in order per user, different users in parallel"""
 
+    def __init__(self, bot, update_queue, executor: KeyedExecutor, **kwargs):
+        super().__init__(bot, update_queue, **kwargs)
+        self.__executor = executor
 
-def error(bot, chat_id, state, message, **botkwagrgs):
-    bot.send_message(chat_id=chat_id, text=f'Something went wrong: {message}', **botkwagrgs)
-    return state
+    def process_update(self, update):
+        user = update.effective_user if isinstance(update, Update) else None
+        # updates without a user aren't part of any conversation, so they don't have to wait for anything
+        key = user.id if user else object()
+        # blocks once the executor is full, which stops the dispatcher from draining the update queue
+        self.__executor.submit(key, partial(Dispatcher.process_update, self, update))
 
 
-def error_to_menu(bot, chat_id, message):
-    return error(bot, chat_id, MAIN_MENU, message,
-                 reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
+class ConcurrentUpdater(Updater):
+    """Updater handling updates on an OrderedDispatcher, with at most max_queued_updates waiting at each stage"""
 
+    def __init__(self, bot: Bot, workers: int, max_queued_updates: int):
+        super().__init__(bot=bot, workers=workers)
+        # once it's full, polling stops fetching and the webhook server stops accepting until handlers catch up
+        self.update_queue = Queue(max_queued_updates)
+        # sharing the updater's exception event lets a failing dispatcher stop polling and the webhook, as it would
+        # with the dispatcher the updater made
+        self.dispatcher = OrderedDispatcher(self.bot, self.update_queue, KeyedExecutor(workers, max_queued_updates),
+                                            job_queue=self.job_queue, exception_event=self._Updater__exception_event)
 
-def unsupported_action(bot, update):
-    chat_id = update.message.chat_id
-    if update.message.from_user.id in builders:
-        del builders[update.message.from_user.id]
-    if update.message.from_user.id in currently_modified_votings:
-        del currently_modified_votings[update.message.from_user.id]
-    return error_to_menu(bot, chat_id, 'unsupported action')
 
+class SessionConversationHandler(ConversationHandler):
+    """Keeps conversation states in the session store and leaves users of other shards alone"""
 
-def cancel(bot, update):
-    if update.message.from_user.id in builders:
-        del builders[update.message.from_user.id]
-    if update.message.from_user.id in currently_modified_votings:
-        del currently_modified_votings[update.message.from_user.id]
-    bot.send_message(chat_id=update.message.chat_id, text='Canceled',
-                     reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
-    return MAIN_MENU
+    def __init__(self, sessions: SessionStore, *args, **kwargs):
+        # check_update hands the matched conversation to handle_update through these, so every worker needs its own
+        self.__current = threading.local()
+        super().__init__(*args, **kwargs)
+        self.conversations = SessionConversations(sessions)
 
+    @property
+    def current_conversation(self):
+        return getattr(self.__current, 'conversation', None)
 
-def finalize_creation(bot, update):
-    user = update.message.from_user
-    chat_id = update.message.chat_id
-    if user.id not in builders:
-        return error(bot, chat_id, VOTING_CREATION, 'try to add some candidates first')
-    res = builders[user.id].get_voting()
-    del builders[user.id]
-    if not res:
-        return error_to_menu(bot, chat_id, 'voting creation failed')
-    candidates = res.get_candidates()
-    if not candidates:
-        return error_to_menu(bot, chat_id, 'candidates extraction failed')
-    candidates = '\n'.join(candidates)
-    logger.info(f'User {user.id} created new voting at address {res.address}')
-    bot.send_message(chat_id=chat_id, text=f"Here's your vote:\n{candidates}")
-    bot.send_message(chat_id=chat_id, text=res.address,
-                     reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
-    return MAIN_MENU
+    @current_conversation.setter
+    def current_conversation(self, key):
+        self.__current.conversation = key
 
+    @property
+    def current_handler(self):
+        return getattr(self.__current, 'handler', None)
 
-def voting_creation(bot, update):
-    user = update.message.from_user
-    chat_id = update.message.chat_id
-    if user.id not in builders:
-        builders[user.id] = VotingBuilder(user.id, VOTING_MANAGER)
-    if len(update.message.text) > CANDIDATE_NAME_LENGTH:
-        return error(bot, chat_id, VOTING_CREATION, f'line too long ({CANDIDATE_NAME_LENGTH} characters is max)')
-    if builders[user.id].contains(update.message.text):
-        return error(bot, chat_id, VOTING_CREATION, 'duplicate candidates are not allowed')
-    status = builders[user.id].add_candidate(update.message.text)
-    if not status:
-        return error(bot, chat_id, VOTING_CREATION, 'candidate list is full\n use /end to finalize voting creation')
-    bot.send_message(chat_id=chat_id, text=f'Added candidate "{update.message.text}" to list')
-    return VOTING_CREATION
-
-
-def voting_selection(bot, update):
-    user = update.message.from_user
-    chat_id = update.message.chat_id
-    voting = VOTING_MANAGER.get_voting_from_address(update.message.text)
-    if not voting:
-        logger.warning(f'User {user.id} {user.username} tried to access wrong address {update.message.text}')
-        return error_to_menu(bot, chat_id, 'wrong address')
-    currently_modified_votings[user.id] = voting
-    candidates = voting.get_candidates()
-    if not candidates:
-        raise NotImplementedError
-    candidates_str = '\n'.join(candidates)
-    bot.send_message(chat_id=chat_id, text=f"Here's a list of candidates\n"
-                                           f"{candidates_str}\n"
-                                           f"You can /view results\n"
-                                           f"You can also /finalize voting (active only for owner)")
-    voted = voting.has_voted(user.id)
-    if voted is None:
-        raise NotImplementedError
-    if not voted:
-        keyb = [[candidate] for candidate in candidates]
-        bot.send_message(chat_id=chat_id,
-                         text='Seems like you haven\'t voted yet!\nYou can choose candidate on the keyboard',
-                         reply_markup=ReplyKeyboardMarkup(keyb, one_time_keyboard=True))
-    logger.info(f'User {user.id} {user.username} accessed voting at address {voting.address}')
-    return VOTING_MANAGER
-
-
-def vote(bot, update):
-    user = update.message.from_user
-    chat_id = update.message.chat_id
-    if user.id not in currently_modified_votings:
-        raise NotImplementedError
-    voting = currently_modified_votings[user.id]
-    voted = voting.has_voted(user.id)
-    if voted is None:
-        del currently_modified_votings[user.id]
-        return error_to_menu(bot, chat_id,
-                             'contract interaction error.\nThere\'s high chance that owner finalized this voting')
-    if voted:
-        return error(bot, chat_id, VOTING_MANAGER, 'you have already voted!')
-    candidates = voting.get_candidates()
-    if not candidates:
-        del currently_modified_votings[user.id]
-        return error_to_menu(bot, chat_id,
-                             'contract interaction error.\nThere\'s high chance that owner finalized this voting')
-    try:
-        ind = candidates.index(update.message.text)
-    except ValueError:
-        return error(bot, chat_id, VOTING_MANAGER, 'candidate not present in the list')
-    res = voting.vote_and_get_results(user.id, ind)
-    if not res:
-        raise NotImplementedError
-    res_str = '\n'.join((f'{candidate} : {votes}' for candidate, votes in res))
-    bot.send_message(chat_id=chat_id, text=f'{voting.address}\n{res_str}')
-    return VOTING_MANAGER
-
-
-def finalize_voting(bot, update):
-    user = update.message.from_user
-    chat_id = update.message.chat_id
-    if user.id not in currently_modified_votings:
-        raise NotImplementedError
-    voting = currently_modified_votings[user.id]
-    address = voting.address
-    res = voting.finalize(user.id)
-    if not res:
-        return error(bot, chat_id, VOTING_MANAGER, 'you are not the owner of this voting!')
-    del currently_modified_votings[user.id]
-    res_str = '\n'.join((f'{candidate} : {votes}' for candidate, votes in res))
-    bot.send_message(chat_id=chat_id,
-                     text=f'Voting at adress:\n{address}\nsuccessfully finalized.\nHere\'s the results\n{res_str}',
+    @current_handler.setter
+    def current_handler(self, handler):
+        self.__current.handler = handler
+
+    def check_update(self, update):
+        user = update.effective_user if isinstance(update, Update) else None
+        if user and user.id % SHARD_COUNT != SHARD_INDEX:
+            return False
+        return super().check_update(update)
+
+
+def instrumented(handler):
+    """Times the handler and attributes the calls and transactions it makes to it"""
+
+    @wraps(handler)
+    def wrapper(*args):
+        with METRICS.handler(handler.__name__), HANDLER_SECONDS.time(handler=handler.__name__):
+            return handler(*args)
+
+    return wrapper
+
+
+@instrumented
+def send_hello(bot, update):
+    bot.send_message(chat_id=update.message.chat_id, text="Hi! This is a voting bot powered by ethereum blockchain!\n"
+                                                          "You can create or select existing voting by clicking on buttons bellow.\n"
+                                                          "To return to main menu from anywhere send /cancel command to the bot.",
                      reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
     return MAIN_MENU
 
 
-def view_results(bot, update):
-    user = update.message.from_user
-    chat_id = update.message.chat_id
-    if user.id not in currently_modified_votings:
-        raise NotImplementedError
-    voting = currently_modified_votings[user.id]
-    address = voting.address
-    res = voting.get_candidates_votes()
-    if not res:
-        del currently_modified_votings[user.id]
-        return error_to_menu(bot, chat_id,
-                             'contract interaction error.\nThere\'s high chance that owner finalized this voting')
-    res_str = '\n'.join((f'{candidate} : {votes}' for candidate, votes in res))
-    bot.send_message(chat_id=chat_id, text=f'{address}\n{res_str}')
-    return VOTING_MANAGER
+def error(bot, chat_id, state, message, **botkwagrgs):
+    bot.send_message(chat_id=chat_id, text=f'Something went wrong: {message}', **botkwagrgs)
+    return state
+
+
+def error_to_menu(bot, chat_id, message):
+    return error(bot, chat_id, MAIN_MENU, message,
+                 reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
 
 
+@instrumented
 def main_menu(bot: Bot, update: Update):
     user = update.message.from_user
     if update.message.text == 'create':
@@ -199,24 +159,246 @@ def main_menu(bot: Bot, update: Update):
     return None
 
 
-updater = Updater('')
-dispatcher = updater.dispatcher
-
-conv_handler = ConversationHandler(
-    entry_points=[CommandHandler('start', send_hello)],
-
-    states={
-        MAIN_MENU: [RegexHandler('^(create|select)$', main_menu)],
-
-        VOTING_CREATION: [CommandHandler('end', finalize_creation), MessageHandler(Filters.text, voting_creation)],
-
-        VOTING_SELECTION: [RegexHandler('^0x[0-9A-Fa-f]+$', voting_selection)],
-        VOTING_MANAGER: [CommandHandler('view', view_results), CommandHandler('finalize', finalize_voting),
-                         MessageHandler(Filters.text, vote)]
-    },
+class VotingBot:
+    """The conversation's handlers, working with the manager and session store they're given"""
+
+    def __init__(self, manager: VotingManager, sessions: SessionStore):
+        self.__manager = manager
+        self.__sessions = sessions
+
+    def _get_builder(self, user_id: int) -> VotingBuilder:
+        return VotingBuilder(user_id, self.__manager, self.__sessions.get(BUILDER_CANDIDATES, user_id))
+
+    def _get_selected_voting(self, user_id: int) -> Optional[Union[Voting, ArchivedVoting]]:
+        address = self.__sessions.get(SELECTED_VOTING, user_id)
+        if address is None:
+            raise NotImplementedError
+        return self.__manager.get_voting_from_address(address)
+
+    def _send_final_results(self, bot, chat_id, user_id: int, voting: ArchivedVoting):
+        self.__sessions.delete(SELECTED_VOTING, user_id)
+        res_str = '\n'.join((f'{candidate} : {votes}' for candidate, votes in voting.get_candidates_votes()))
+        bot.send_message(chat_id=chat_id, text=f'Voting at adress:\n{voting.address}\nis finalized.\n'
+                                               f'Here\'s the results\n{res_str}',
+                         reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
+        return MAIN_MENU
+
+    def _forget_user(self, user_id: int):
+        self.__sessions.delete(BUILDER_CANDIDATES, user_id)
+        self.__sessions.delete(SELECTED_VOTING, user_id)
+
+    @instrumented
+    def unsupported_action(self, bot, update):
+        chat_id = update.message.chat_id
+        self._forget_user(update.message.from_user.id)
+        return error_to_menu(bot, chat_id, 'unsupported action')
+
+    @instrumented
+    def cancel(self, bot, update):
+        self._forget_user(update.message.from_user.id)
+        bot.send_message(chat_id=update.message.chat_id, text='Canceled',
+                         reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
+        return MAIN_MENU
+
+    @instrumented
+    def finalize_creation(self, bot, update):
+        user = update.message.from_user
+        chat_id = update.message.chat_id
+        if self.__sessions.get(BUILDER_CANDIDATES, user.id) is None:
+            return error(bot, chat_id, VOTING_CREATION, 'try to add some candidates first')
+        res = self._get_builder(user.id).get_voting()
+        self.__sessions.delete(BUILDER_CANDIDATES, user.id)
+        if not res:
+            return error_to_menu(bot, chat_id, 'voting creation failed')
+        candidates = res.get_candidates()
+        if not candidates:
+            return error_to_menu(bot, chat_id, 'candidates extraction failed')
+        candidates = '\n'.join(candidates)
+        logger.info(f'User {user.id} created new voting at address {res.address}')
+        bot.send_message(chat_id=chat_id, text=f"Here's your vote:\n{candidates}")
+        bot.send_message(chat_id=chat_id, text=res.address,
+                         reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
+        return MAIN_MENU
+
+    @instrumented
+    def voting_creation(self, bot, update):
+        user = update.message.from_user
+        chat_id = update.message.chat_id
+        builder = self._get_builder(user.id)
+        if len(update.message.text) > CANDIDATE_NAME_LENGTH:
+            return error(bot, chat_id, VOTING_CREATION, f'line too long ({CANDIDATE_NAME_LENGTH} characters is max)')
+        if len(update.message.text.encode()) > CANDIDATE_NAME_BYTES:
+            return error(bot, chat_id, VOTING_CREATION, f'line too long ({CANDIDATE_NAME_BYTES} bytes is max)')
+        if builder.contains(update.message.text):
+            return error(bot, chat_id, VOTING_CREATION, 'duplicate candidates are not allowed')
+        status = builder.add_candidate(update.message.text)
+        if not status:
+            return error(bot, chat_id, VOTING_CREATION, 'candidate list is full\n use /end to finalize voting creation')
+        self.__sessions.set(BUILDER_CANDIDATES, user.id, builder.candidates)
+        bot.send_message(chat_id=chat_id, text=f'Added candidate "{update.message.text}" to list')
+        return VOTING_CREATION
 
-    fallbacks=[CommandHandler('cancel', cancel), MessageHandler(Filters.all, unsupported_action)]
-)
-dispatcher.add_handler(conv_handler)
-logger.info('Running')
-updater.start_polling()
+    @instrumented
+    def voting_selection(self, bot, update):
+        user = update.message.from_user
+        chat_id = update.message.chat_id
+        voting = self.__manager.get_voting_from_address(update.message.text)
+        if not voting:
+            logger.warning(f'User {user.id} {user.username} tried to access wrong address {update.message.text}')
+            return error_to_menu(bot, chat_id, 'wrong address')
+        if voting.finalized:
+            logger.info(f'User {user.id} {user.username} accessed finalized voting at address {voting.address}')
+            return self._send_final_results(bot, chat_id, user.id, voting)
+        self.__sessions.set(SELECTED_VOTING, user.id, voting.address)
+        candidates = voting.get_candidates()
+        if not candidates:
+            raise NotImplementedError
+        candidates_str = '\n'.join(candidates)
+        bot.send_message(chat_id=chat_id, text=f"Here's a list of candidates\n"
+                                               f"{candidates_str}\n"
+                                               f"You can /view results\n"
+                                               f"You can also /finalize voting (active only for owner)")
+        voted = voting.has_voted(user.id)
+        if voted is None:
+            raise NotImplementedError
+        if not voted:
+            keyb = [[candidate] for candidate in candidates]
+            bot.send_message(chat_id=chat_id,
+                             text='Seems like you haven\'t voted yet!\nYou can choose candidate on the keyboard',
+                             reply_markup=ReplyKeyboardMarkup(keyb, one_time_keyboard=True))
+        logger.info(f'User {user.id} {user.username} accessed voting at address {voting.address}')
+        return VOTING_MANAGEMENT
+
+    @instrumented
+    def vote(self, bot, update):
+        user = update.message.from_user
+        chat_id = update.message.chat_id
+        voting = self._get_selected_voting(user.id)
+        if voting and voting.finalized:
+            return self._send_final_results(bot, chat_id, user.id, voting)
+        voted = voting.has_voted(user.id) if voting else None
+        if voted is None:
+            self.__sessions.delete(SELECTED_VOTING, user.id)
+            return error_to_menu(bot, chat_id,
+                                 'contract interaction error.\nThere\'s high chance that owner finalized this voting')
+        if voted:
+            return error(bot, chat_id, VOTING_MANAGEMENT, 'you have already voted!')
+        candidates = voting.get_candidates()
+        if not candidates:
+            self.__sessions.delete(SELECTED_VOTING, user.id)
+            return error_to_menu(bot, chat_id,
+                                 'contract interaction error.\nThere\'s high chance that owner finalized this voting')
+        try:
+            ind = candidates.index(update.message.text)
+        except ValueError:
+            return error(bot, chat_id, VOTING_MANAGEMENT, 'candidate not present in the list')
+        address = voting.address
+
+        def send_results(res):
+            if not res:
+                error(bot, chat_id, VOTING_MANAGEMENT, 'your vote was not accepted')
+                return
+            res_str = '\n'.join((f'{candidate} : {votes}' for candidate, votes in res))
+            bot.send_message(chat_id=chat_id, text=f'{address}\n{res_str}')
+
+        if not voting.vote_async(user.id, ind, send_results):
+            raise NotImplementedError
+        bot.send_message(chat_id=chat_id, text='Your vote is submitted, results will follow once it is mined')
+        return VOTING_MANAGEMENT
+
+    @instrumented
+    def finalize_voting(self, bot, update):
+        user = update.message.from_user
+        chat_id = update.message.chat_id
+        voting = self._get_selected_voting(user.id)
+        if not voting:
+            self.__sessions.delete(SELECTED_VOTING, user.id)
+            return error_to_menu(bot, chat_id,
+                                 'contract interaction error.\nThere\'s high chance that owner finalized this voting')
+        if voting.finalized:
+            return self._send_final_results(bot, chat_id, user.id, voting)
+        address = voting.address
+
+        def send_results(res):
+            if not res:
+                error_to_menu(bot, chat_id, f'finalization of {address} failed')
+                return
+            res_str = '\n'.join((f'{candidate} : {votes}' for candidate, votes in res))
+            bot.send_message(chat_id=chat_id, text=f'Voting at adress:\n{address}\nsuccessfully finalized.\n'
+                                                   f'Here\'s the results\n{res_str}',
+                             reply_markup=ReplyKeyboardMarkup(MAIN_MENU_KEYBOARD, one_time_keyboard=True))
+
+        if not voting.finalize_async(user.id, send_results):
+            return error(bot, chat_id, VOTING_MANAGEMENT, 'you are not the owner of this voting!')
+        self.__sessions.delete(SELECTED_VOTING, user.id)
+        bot.send_message(chat_id=chat_id, text='Finalization is submitted, results will follow once it is mined')
+        return MAIN_MENU
+
+    @instrumented
+    def view_results(self, bot, update):
+        user = update.message.from_user
+        chat_id = update.message.chat_id
+        voting = self._get_selected_voting(user.id)
+        if voting and voting.finalized:
+            return self._send_final_results(bot, chat_id, user.id, voting)
+        res = voting.get_candidates_votes() if voting else None
+        if not res:
+            self.__sessions.delete(SELECTED_VOTING, user.id)
+            return error_to_menu(bot, chat_id,
+                                 'contract interaction error.\nThere\'s high chance that owner finalized this voting')
+        res_str = '\n'.join((f'{candidate} : {votes}' for candidate, votes in res))
+        bot.send_message(chat_id=chat_id, text=f'{voting.address}\n{res_str}')
+        return VOTING_MANAGEMENT
+
+    def conversation_handler(self) -> SessionConversationHandler:
+        return SessionConversationHandler(
+            self.__sessions,
+            entry_points=[CommandHandler('start', send_hello)],
+
+            states={
+                MAIN_MENU: [RegexHandler('^(create|select)$', main_menu)],
+
+                VOTING_CREATION: [CommandHandler('end', self.finalize_creation),
+                                  MessageHandler(Filters.text, self.voting_creation)],
+
+                VOTING_SELECTION: [RegexHandler('^0x[0-9A-Fa-f]+$', self.voting_selection)],
+                VOTING_MANAGEMENT: [CommandHandler('view', self.view_results),
+                                    CommandHandler('finalize', self.finalize_voting),
+                                    MessageHandler(Filters.text, self.vote)]
+            },
+
+            fallbacks=[CommandHandler('cancel', self.cancel), MessageHandler(Filters.all, self.unsupported_action)]
+        )
+
+
+def build_updater(bot: Bot, manager: VotingManager, sessions: SessionStore, workers: int = BOT_WORKERS,
+                  max_queued_updates: int = MAX_QUEUED_UPDATES) -> ConcurrentUpdater:
+    """Wires the conversation to bot; nothing here talks to telegram or the node until the updater is started"""
+    updater = ConcurrentUpdater(bot, workers, max_queued_updates)
+    updater.dispatcher.add_handler(VotingBot(manager, sessions).conversation_handler())
+    return updater
+
+
+def main():
+    if SHARD_COUNT > 1 and not WEBHOOK_URL:
+        # a polled update goes to whichever process fetches it first, not the one serving its user
+        raise SystemExit('sharded processes need VOTING_BOT_WEBHOOK_URL and update_router.py in front of them')
+    sessions = SqliteSessionStore(SESSION_DB) if SESSION_DB else InMemorySessionStore()
+    # a connection for each worker, the dispatcher, polling, the job queue and the main thread
+    bot = Bot(BOT_TOKEN, request=Request(con_pool_size=BOT_WORKERS + 4))
+    # shards send from the same admin accounts, so the node has to number their transactions
+    manager = VotingManager(ETHEREUM_NODES, index_checkpoint_path=INDEX_CHECKPOINT_PATH,
+                            clone_factory_address=CLONE_FACTORY_ADDRESS, archive_path=ARCHIVE_PATH,
+                            local_nonces=SHARD_COUNT == 1)
+    updater = build_updater(bot, manager, sessions)
+    METRICS.serve(METRICS_PORT)
+    logger.info('Running')
+    if WEBHOOK_URL:
+        updater.start_webhook(listen='127.0.0.1', port=WEBHOOK_PORT, url_path=urlparse(WEBHOOK_URL).path)
+        updater.bot.set_webhook(WEBHOOK_URL)
+    else:
+        updater.start_polling()
+
+
+if __name__ == '__main__':
+    main()
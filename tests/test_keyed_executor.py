@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from backend.KeyedExecutor import KeyedExecutor
+
+TIMEOUT = 5
+
+
+def wait_until_idle(executor: KeyedExecutor) -> None:
+    deadline = time.monotonic() + TIMEOUT
+    while executor.pending:
+        assert time.monotonic() < deadline, f'{executor.pending} tasks still pending'
+        time.sleep(0.01)
+
+
+def test_tasks_of_one_key_run_in_order_and_never_overlap():
+    executor = KeyedExecutor(workers=8, max_pending=1000)
+    lock = threading.Lock()
+    running = set()
+    overlaps = []
+    done = {key: [] for key in range(10)}
+
+    def task(key: int, index: int):
+        with lock:
+            if key in running:
+                overlaps.append(key)
+            running.add(key)
+        time.sleep(0.001)
+        with lock:
+            running.discard(key)
+            done[key].append(index)
+
+    submitters = [threading.Thread(target=lambda key=key: [executor.submit(key, lambda i=i: task(key, i))
+                                                            for i in range(30)])
+                  for key in done]
+    for submitter in submitters:
+        submitter.start()
+    for submitter in submitters:
+        submitter.join()
+    wait_until_idle(executor)
+    assert not overlaps
+    assert done == {key: list(range(30)) for key in done}
+
+
+def test_different_keys_run_in_parallel():
+    executor = KeyedExecutor(workers=2)
+    # only passes if both tasks are running at the same time
+    barrier = threading.Barrier(2, timeout=TIMEOUT)
+    passed = []
+    for key in ('a', 'b'):
+        executor.submit(key, lambda: passed.append(barrier.wait()))
+    wait_until_idle(executor)
+    assert sorted(passed) == [0, 1]
+
+
+def test_submit_blocks_once_max_pending_tasks_are_queued():
+    executor = KeyedExecutor(workers=1, max_pending=2)
+    release = threading.Event()
+    executor.submit('a', lambda: release.wait(TIMEOUT))
+    assert executor.submit('b', lambda: None)
+    assert not executor.submit('c', lambda: None, timeout=0.1)
+    assert executor.pending == 2
+    release.set()
+    assert executor.submit('c', lambda: None, timeout=TIMEOUT)
+    wait_until_idle(executor)
+
+
+def test_blocked_submit_resumes_when_a_task_finishes():
+    executor = KeyedExecutor(workers=1, max_pending=1)
+    release = threading.Event()
+    executor.submit('a', lambda: release.wait(TIMEOUT))
+    submitted = []
+    submitter = threading.Thread(target=lambda: submitted.append(executor.submit('b', lambda: None)))
+    submitter.start()
+    submitter.join(0.1)
+    assert submitter.is_alive()
+    release.set()
+    submitter.join(TIMEOUT)
+    assert submitted == [True]
+    wait_until_idle(executor)
+
+
+def test_a_failing_task_does_not_stop_the_tasks_behind_it():
+    executor = KeyedExecutor(workers=1)
+    ran = []
+
+    def fail():
+        raise RuntimeError('handler failed')
+
+    executor.submit('a', fail)
+    executor.submit('a', lambda: ran.append('a'))
+    wait_until_idle(executor)
+    assert ran == ['a']
+
+
+@pytest.mark.parametrize('workers, max_pending', [(0, 1), (1, 0)])
+def test_rejects_empty_pools(workers, max_pending):
+    with pytest.raises(ValueError):
+        KeyedExecutor(workers, max_pending)
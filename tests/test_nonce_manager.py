@@ -0,0 +1,90 @@
+from backend.NonceManager import NonceManager
+
+ACCOUNT = '0x0000000000000000000000000000000000000001'
+
+
+class FakeNode:
+    def __init__(self, pending_count: int = 0):
+        self.pending_count = pending_count
+        self.asked = 0
+
+    def get_transaction_count(self, account: str) -> int:
+        self.asked += 1
+        return self.pending_count
+
+
+def test_allocates_consecutive_nonces_from_the_pending_count():
+    node = FakeNode(5)
+    nonces = NonceManager(node.get_transaction_count)
+    assert [nonces.allocate(ACCOUNT) for _ in range(3)] == [5, 6, 7]
+    assert node.asked == 1
+
+
+def test_released_nonces_are_reused_lowest_first():
+    nonces = NonceManager(FakeNode().get_transaction_count)
+    for _ in range(5):
+        nonces.allocate(ACCOUNT)
+    nonces.release(ACCOUNT, 3)
+    nonces.release(ACCOUNT, 1)
+    assert [nonces.allocate(ACCOUNT) for _ in range(3)] == [1, 3, 5]
+
+
+def test_releasing_the_latest_nonce_hands_it_out_again_without_a_gap():
+    nonces = NonceManager(FakeNode().get_transaction_count)
+    nonces.allocate(ACCOUNT)
+    latest = nonces.allocate(ACCOUNT)
+    nonces.release(ACCOUNT, latest)
+    assert nonces.allocate(ACCOUNT) == latest
+    assert nonces.allocate(ACCOUNT) == latest + 1
+
+
+def test_releasing_twice_does_not_hand_the_nonce_out_twice():
+    nonces = NonceManager(FakeNode().get_transaction_count)
+    for _ in range(3):
+        nonces.allocate(ACCOUNT)
+    nonces.release(ACCOUNT, 0)
+    nonces.release(ACCOUNT, 0)
+    assert [nonces.allocate(ACCOUNT) for _ in range(2)] == [0, 3]
+
+
+def test_resync_drops_gaps_the_node_has_used_up():
+    node = FakeNode()
+    nonces = NonceManager(node.get_transaction_count)
+    for _ in range(4):
+        nonces.allocate(ACCOUNT)
+    nonces.release(ACCOUNT, 1)
+    # someone else sent from the account, the node is past all of our nonces
+    node.pending_count = 10
+    nonces.resync(ACCOUNT)
+    assert nonces.allocate(ACCOUNT) == 10
+
+
+def test_resync_turns_nonces_missing_from_the_node_into_gaps():
+    node = FakeNode()
+    nonces = NonceManager(node.get_transaction_count)
+    for _ in range(5):
+        nonces.allocate(ACCOUNT)
+    for nonce in (0, 1, 2):
+        nonces.confirm(ACCOUNT, nonce)
+    # a reorg took 2 out again while 3 and 4 are still in flight
+    node.pending_count = 2
+    nonces.resync(ACCOUNT)
+    assert [nonces.allocate(ACCOUNT) for _ in range(2)] == [2, 5]
+
+
+def test_resync_keeps_in_flight_nonces_ahead_of_a_lagging_node():
+    node = FakeNode()
+    nonces = NonceManager(node.get_transaction_count)
+    for _ in range(3):
+        nonces.allocate(ACCOUNT)
+    nonces.resync(ACCOUNT)
+    # the node hasn't seen any of them yet, but they're in flight, so none of them is handed out again
+    assert nonces.allocate(ACCOUNT) == 3
+
+
+def test_accounts_are_numbered_independently():
+    other = '0x0000000000000000000000000000000000000002'
+    nonces = NonceManager(FakeNode(7).get_transaction_count)
+    assert nonces.allocate(ACCOUNT) == 7
+    assert nonces.allocate(other) == 7
+    assert nonces.allocate(ACCOUNT) == 8
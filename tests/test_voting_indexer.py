@@ -0,0 +1,117 @@
+import json
+from typing import List
+
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+
+from backend.VotingArtifacts import VOTING_ABI
+from backend.VotingIndexer import VotingIndexer
+
+EVENTS = {entry['name']: entry for entry in json.loads(VOTING_ABI) if entry['type'] == 'event'}
+VOTING = '0x' + '11' * 20
+
+
+class FakeEth:
+    """Just enough of w3.eth for the indexer: a block number and the logs mined up to it"""
+
+    def __init__(self):
+        self.blockNumber = 0
+        self.logs: List[dict] = []
+
+    def vote(self, voter_id: int, candidate_index: int) -> None:
+        self.blockNumber += 1
+        self.logs.append({
+            'address': VOTING, 'blockNumber': self.blockNumber, 'blockHash': HexBytes(32),
+            'transactionHash': HexBytes(32), 'transactionIndex': 0, 'logIndex': 0,
+            'topics': [HexBytes(event_abi_to_log_topic(EVENTS['Voted'])), HexBytes(voter_id.to_bytes(32, 'big'))],
+            'data': '0x' + candidate_index.to_bytes(32, 'big').hex(),
+        })
+
+    def getLogs(self, log_filter: dict) -> List[dict]:
+        return [log for log in self.logs if log['address'] in log_filter['address']
+                and log_filter['fromBlock'] <= log['blockNumber'] <= log_filter['toBlock']]
+
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+
+def make_indexer(w3: FakeWeb3, path: str) -> VotingIndexer:
+    return VotingIndexer(w3, EVENTS['Voted'], EVENTS['Finalized'], path)
+
+
+def tear_last_line(path: str) -> None:
+    with open(path) as f:
+        lines = f.readlines()
+    assert len(lines) >= 2
+    with open(path, 'w') as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:len(lines[-1]) // 2])
+
+
+def test_replays_snapshot_and_journal_up_to_a_torn_last_line(tmp_path):
+    w3 = FakeWeb3()
+    path = str(tmp_path / 'voting-index.json')
+    indexer = make_indexer(w3, path)
+    indexer.track(VOTING, backfill=False)
+    w3.eth.vote(1, 0)
+    w3.eth.vote(2, 1)
+    indexer.sync()
+    # snapshot at block 2, then one journal entry per sync
+    indexer.stop()
+    indexer = make_indexer(w3, path)
+    w3.eth.vote(3, 1)
+    indexer.sync()
+    w3.eth.vote(4, 0)
+    indexer.sync()
+    # the process dies while writing the entry of block 4
+    tear_last_line(path + '.journal')
+
+    resumed = make_indexer(w3, path)
+    assert resumed.get_tallies(VOTING) == {0: 1, 1: 2}
+    assert resumed.has_voted(VOTING, 3)
+    assert not resumed.has_voted(VOTING, 4)
+    # the cursor is at the last readable entry, so the lost logs are read again
+    resumed.sync()
+    assert resumed.get_tallies(VOTING) == {0: 2, 1: 2}
+    assert resumed.has_voted(VOTING, 4)
+
+
+def test_entries_written_after_a_torn_line_survive_the_next_restart(tmp_path):
+    w3 = FakeWeb3()
+    path = str(tmp_path / 'voting-index.json')
+    indexer = make_indexer(w3, path)
+    indexer.track(VOTING, backfill=False)
+    w3.eth.vote(1, 0)
+    indexer.sync()
+    w3.eth.vote(2, 1)
+    indexer.sync()
+    tear_last_line(path + '.journal')
+
+    resumed = make_indexer(w3, path)
+    w3.eth.vote(3, 1)
+    resumed.sync()
+
+    restarted = make_indexer(w3, path)
+    assert restarted.get_tallies(VOTING) == {0: 1, 1: 2}
+    assert all(restarted.has_voted(VOTING, voter_id) for voter_id in (1, 2, 3))
+
+
+def test_replaying_changes_already_in_the_snapshot_counts_them_once(tmp_path):
+    w3 = FakeWeb3()
+    path = str(tmp_path / 'voting-index.json')
+    indexer = make_indexer(w3, path)
+    indexer.track(VOTING, backfill=False)
+    w3.eth.vote(1, 0)
+    indexer.sync()
+    with open(path + '.journal') as f:
+        journal = f.read()
+    # a crash between writing the snapshot and emptying the journal
+    indexer.stop()
+    with open(path + '.journal', 'w') as f:
+        f.write(journal)
+
+    resumed = make_indexer(w3, path)
+    assert resumed.get_tallies(VOTING) == {0: 1}
+    assert resumed.has_voted(VOTING, 1)
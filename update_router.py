@@ -0,0 +1,93 @@
+"""Receives the bot's webhook updates and forwards each one to the sharded bot process serving its user.
+
+Bot processes started with VOTING_BOT_SHARD=index/count listen on VOTING_BOT_WEBHOOK_PORT + index. Point
+VOTING_BOT_WEBHOOK_URL (TLS terminated in front) at the router instead of at a bot process:
+
+    python update_router.py --shards 4 --port 8080 --shard-base-port 8443
+
+A user's updates always reach the same process, updates without a user go to shard 0. Telegram gets the
+shard's answer back, so updates a shard could not take are delivered again.
+"""
+import argparse
+import json
+import logging
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from telegram import Update
+
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORWARD_TIMEOUT = 30
+
+
+def shard_of(update: dict, shard_count: int) -> int:
+    # the same user the bot processes filter on
+    user = Update.de_json(update, None).effective_user
+    return user.id % shard_count if user else 0
+
+
+class UpdateRouter(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, shard_count: int, shard_base_port: int, shard_host: str = '127.0.0.1'):
+        super().__init__(address, _RouterHandler)
+        self.shard_count = shard_count
+        self.shard_base_port = shard_base_port
+        self.shard_host = shard_host
+
+    def shard_url(self, shard: int, path: str) -> str:
+        return f'http://{self.shard_host}:{self.shard_base_port + shard}{path}'
+
+
+class _RouterHandler(BaseHTTPRequestHandler):
+    server: UpdateRouter
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            shard = shard_of(json.loads(body.decode()), self.server.shard_count)
+        except Exception as e:
+            # telegram would only send it again
+            logger.warning(f'dropping malformed update: {e}')
+            self._respond(200)
+            return
+        request = urllib.request.Request(self.server.shard_url(shard, self.path), data=body,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=FORWARD_TIMEOUT) as response:
+                self._respond(response.status)
+        except urllib.error.HTTPError as e:
+            self._respond(e.code)
+        except Exception as e:
+            logger.error(f'shard {shard} did not take an update: {e}')
+            self._respond(502)
+
+    def _respond(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Forwards webhook updates to the bot process serving their user')
+    parser.add_argument('--shards', type=int, required=True, help='count of VOTING_BOT_SHARD')
+    parser.add_argument('--port', type=int, default=8080, help='port the router listens on')
+    parser.add_argument('--shard-base-port', type=int, default=8443,
+                        help='VOTING_BOT_WEBHOOK_PORT of the bot processes, shard i listens on this port + i')
+    parser.add_argument('--listen', default='127.0.0.1', help='address the router listens on')
+    args = parser.parse_args()
+    router = UpdateRouter((args.listen, args.port), args.shards, args.shard_base_port)
+    logger.info(f'routing updates from {args.listen}:{args.port} to {args.shards} shards from port '
+                f'{args.shard_base_port}')
+    router.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,55 +2,130 @@ pragma solidity ^0.4.21;
 
 contract Voting{
     address admin;
-    mapping (uint256=>uint256) votes;
-    bytes[] candidateList;
-    mapping (uint256=>bool) votedIds;
     uint256 owner;
+    bytes32[] candidateList;
+    uint256[] votes;
+    // bit (voterId % 256) of word (voterId / 256) is set once the voter has voted
+    mapping (uint256=>uint256) votedBits;
 
+    event Voted(uint256 indexed voterId, uint256 candidateIndex);
+    event VoteSkipped(uint256 indexed voterId);
+    event Finalized();
+
+    // direct deployments take 0-separated names, clones are set up through initialize instead
     constructor (bytes candidates, uint256 ownerId) public{
         admin = msg.sender;
         owner = ownerId;
-        candidateList.push(new bytes(0));
+        bytes32 name;
+        uint256 length = 0;
         for (uint256 index = 0; index < candidates.length; index++) {
             if (candidates[index] == 0) {
-                candidateList.push(new bytes(0));
+                candidateList.push(name);
+                name = bytes32(0);
+                length = 0;
             } else {
-                candidateList[candidateList.length - 1].push(candidates[index]);   
+                require(length < 32);
+                name |= bytes32(candidates[index]) >> (length * 8);
+                length++;
+            }
+        }
+        candidateList.push(name);
+        votes.length = candidateList.length;
+    }
+
+    // packedCandidates is a sequence of (1 byte length, name) records, every name is at most 32 bytes long
+    function initialize(bytes packedCandidates, uint256 ownerId, address votingAdmin) public {
+        require(admin == address(0) && votingAdmin != address(0));
+        admin = votingAdmin;
+        owner = ownerId;
+        uint256 offset = 0;
+        while (offset < packedCandidates.length) {
+            uint256 length = uint256(uint8(packedCandidates[offset]));
+            require(length <= 32 && offset + 1 + length <= packedCandidates.length);
+            bytes32 name;
+            assembly {
+                name := mload(add(add(packedCandidates, 33), offset))
+            }
+            if (length < 32) {
+                name &= ~bytes32((uint256(1) << (256 - length * 8)) - 1);
             }
+            candidateList.push(name);
+            offset += 1 + length;
         }
+        votes.length = candidateList.length;
     }
-    
+
     function getOwner() public view returns (uint256){
         return owner;
     }
-    
-    function getCandidate(uint256 index) public view returns (bytes){
-        require(msg.sender == admin);
-        return candidateList[index];
-    }
-    
+
     function getNumberOfCandidates() public view returns (uint256){
         return candidateList.length;
     }
-    
-    function getCandidateVotes(uint256 index) public view returns(uint256){
+
+    function getResults() public view returns (bytes32[], uint256[]){
         require(msg.sender == admin);
-        return votes[index];
+        return (candidateList, votes);
+    }
+
+    function markVoted(uint256 voterId) private {
+        votedBits[voterId >> 8] |= uint256(1) << (voterId & 0xff);
     }
 
     function vote(uint256 voterId, uint256 candidateIndex) public {
         require(msg.sender == admin && !hasVoted(voterId) && candidateIndex < candidateList.length);
-        votedIds[voterId] = true;
+        markVoted(voterId);
         votes[candidateIndex]++;
+        emit Voted(voterId, candidateIndex);
+    }
+
+    function voteBatch(uint256[] voterIds, uint256[] candidateIndexes) public {
+        require(msg.sender == admin && voterIds.length == candidateIndexes.length);
+        for (uint256 i = 0; i < voterIds.length; i++) {
+            if (hasVoted(voterIds[i]) || candidateIndexes[i] >= candidateList.length) {
+                emit VoteSkipped(voterIds[i]);
+                continue;
+            }
+            markVoted(voterIds[i]);
+            votes[candidateIndexes[i]]++;
+            emit Voted(voterIds[i], candidateIndexes[i]);
+        }
     }
 
     function hasVoted(uint256 voterId) public view returns (bool){
         require(msg.sender == admin);
-        return votedIds[voterId];
+        return (votedBits[voterId >> 8] >> (voterId & 0xff)) & 1 == 1;
     }
-    
+
     function kill() public{
         require(msg.sender == admin);
+        emit Finalized();
         selfdestruct(admin);
     }
-}
\ No newline at end of file
+}
+
+contract VotingFactory{
+    address public implementation;
+
+    event VotingCreated(address voting);
+
+    constructor () public{
+        // the factory is the template's admin and never kills it, so clones can't lose their code
+        implementation = new Voting("", 0);
+    }
+
+    // deploys an EIP-1167 minimal proxy delegating to the template and initializes it for the caller
+    function createVoting(bytes packedCandidates, uint256 ownerId) public returns (address voting){
+        bytes20 target = bytes20(implementation);
+        assembly {
+            let clone := mload(0x40)
+            mstore(clone, 0x3d602d80600a3d3981f3363d3d373d3d3d363d73000000000000000000000000)
+            mstore(add(clone, 0x14), target)
+            mstore(add(clone, 0x28), 0x5af43d82803e903d91602b57fd5bf30000000000000000000000000000000000)
+            voting := create(0, clone, 0x37)
+        }
+        require(voting != address(0));
+        Voting(voting).initialize(packedCandidates, ownerId, msg.sender);
+        emit VotingCreated(voting);
+    }
+}